@@ -31,7 +31,19 @@ except ImportError:  # pragma: nocover
     # for python < 3.8
     import importlib_metadata
 
-from . import parsers, renderers
+from . import (
+    abbreviations,
+    analyze,
+    batch,
+    diff,
+    filters,
+    journal,
+    models,
+    parsers,
+    renderers,
+    snapshots,
+    sorting,
+)
 from .models import (
     Memory,
     Mode,
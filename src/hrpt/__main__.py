@@ -24,6 +24,9 @@ Entry point for 'hrpt' command line program.
 """
 
 import argparse
+import contextlib
+import json
+import os
 import sys
 import textwrap
 
@@ -33,11 +36,25 @@ EXIT_SUCCESS = 0
 EXIT_ERROR = 1
 EXIT_USAGE = 2
 
+JOURNAL_NAME = ".hrpt-journal.sqlite"
+
 
 def _build_parser():
     """build an arg parser with all the proper parameters"""
     desc = "Ham Radio Programming Toolkit"
-    epilog = """"""
+    epilog = """
+        With no command, convert the input file to the output file. The --from
+        option also sets the format of the files read by the commands.
+
+        Use jsonl to pipe hrpt commands together without losing anything:
+
+            hrpt -i master.csv --to jsonl --where "band == 2m" | hrpt --from jsonl
+
+        Filter expressions use Memory fields, band, and len(field) with
+        comparisons, in, and, or, and not. For example:
+
+            hrpt -i master.csv --where "band in (2m, 70cm) and tx_ctcss_freq"
+    """
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description=desc,
@@ -50,6 +67,40 @@ def _build_parser():
     output_file_help = "file to write output to"
     parser.add_argument("-o", "--output-file", help=output_file_help)
 
+    from_help = "format of the input, default chirp"
+    parser.add_argument(
+        "-f",
+        "--from",
+        choices=sorted(hrpt.parsers.PARSERS),
+        default="chirp",
+        dest="input_format",
+        help=from_help,
+    )
+
+    to_help = "format of the output, default adms16"
+    parser.add_argument(
+        "-t",
+        "--to",
+        choices=sorted(hrpt.renderers.RENDERERS),
+        default="adms16",
+        dest="output_format",
+        help=to_help,
+    )
+
+    where_help = "only convert memories which match this expression"
+    parser.add_argument("-w", "--where", metavar="EXPRESSION", help=where_help)
+
+    set_help = "set field to value in every converted memory, may be repeated"
+    parser.add_argument(
+        "-s",
+        "--set",
+        action="append",
+        default=[],
+        dest="transforms",
+        metavar="FIELD=VALUE",
+        help=set_help,
+    )
+
     parser.add_argument(
         "-v",
         "--version",
@@ -57,33 +108,343 @@ def _build_parser():
         version=hrpt.VERSION_STRING,
         help="show the version information and exit",
     )
-    return parser
 
+    sort_help = (
+        "sort memories before rendering them, if the output format puts memories"
+        " in slots by number, memories sorted by anything but number are"
+        " renumbered from 1"
+    )
+    parser.add_argument(
+        "--sort", choices=sorted(hrpt.sorting.SORT_KEYS), help=sort_help
+    )
 
-def main(argv=None):
-    """main function"""
-    argparser = _build_parser()
-    args = argparser.parse_args(argv)
+    sort_buffer_help = (
+        "most memories to hold in memory when sorting or assigning short names,"
+        " the rest are spilled to temporary files,"
+        f" default {hrpt.sorting.DEFAULT_BUFFER_SIZE}"
+    )
+    parser.add_argument(
+        "--sort-buffer",
+        type=int,
+        default=hrpt.sorting.DEFAULT_BUFFER_SIZE,
+        metavar="COUNT",
+        help=sort_buffer_help,
+    )
+
+    jobs_help = "render using this many processes, default 1"
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help=jobs_help)
+
+    short_names_help = "fill in 6 and 8 character names from the 16 character name"
+    parser.add_argument("--short-names", action="store_true", help=short_names_help)
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    diff_help = "show what changed between two sets of memories"
+    diff_parser = subparsers.add_parser("diff", help=diff_help, description=diff_help)
+    diff_parser.add_argument("old_file", help="file containing the old memories")
+    diff_parser.add_argument("new_file", help="file containing the new memories")
+    diff_parser.add_argument(
+        "-j", "--json", action="store_true", help="output the differences as json"
+    )
+
+    analyze_help = "look for intermod and adjacent channel problems"
+    analyze_parser = subparsers.add_parser(
+        "analyze", help=analyze_help, description=analyze_help
+    )
+    analyze_parser.add_argument("input_file", help="file containing the memories")
+    tolerance_help = (
+        "how close in Hz an intermod product must be to a channel to be a problem,"
+        f" default {hrpt.analyze.DEFAULT_TOLERANCE}"
+    )
+    analyze_parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=hrpt.analyze.DEFAULT_TOLERANCE,
+        metavar="HZ",
+        help=tolerance_help,
+    )
+    spacing_help = (
+        "channels closer together than this many Hz are a problem,"
+        f" default {hrpt.analyze.DEFAULT_SPACING}"
+    )
+    analyze_parser.add_argument(
+        "--spacing",
+        type=int,
+        default=hrpt.analyze.DEFAULT_SPACING,
+        metavar="HZ",
+        help=spacing_help,
+    )
+    limit_help = (
+        "stop looking for intermod after this many hits in a band, 0 for no limit,"
+        f" default {hrpt.analyze.DEFAULT_LIMIT}"
+    )
+    analyze_parser.add_argument(
+        "--limit",
+        type=int,
+        default=hrpt.analyze.DEFAULT_LIMIT,
+        metavar="COUNT",
+        help=limit_help,
+    )
+    analyze_parser.add_argument(
+        "-j", "--json", action="store_true", help="output the problems as json"
+    )
 
-    parser = hrpt.parsers.CHIRPParser()
-    # TODO maybe the open should be encapsulated in the parser because
+    batch_help = "convert many files, and resume where we left off if interrupted"
+    batch_parser = subparsers.add_parser(
+        "batch", help=batch_help, description=batch_help
+    )
+    batch_parser.add_argument("input_files", nargs="+", help="files to convert")
+    batch_parser.add_argument(
+        "-d",
+        "--output-dir",
+        required=True,
+        help="directory to write output files to, named after the input files",
+    )
+    batch_parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="skip files which were already converted from the same input",
+    )
+    journal_help = (
+        "file to keep track of completed conversions in,"
+        f" default {JOURNAL_NAME} in the output directory"
+    )
+    batch_parser.add_argument("--journal", help=journal_help)
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="number of files to convert at once",
+    )
+
+    snapshot_help = "keep every revision of a set of memories"
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help=snapshot_help, description=snapshot_help
+    )
+    snapshot_parser.add_argument("store", help="file containing the snapshots")
+    snapshot_commands = snapshot_parser.add_subparsers(
+        dest="snapshot_command", metavar="action", required=True
+    )
+    commit_help = "store the memories in a file as a new revision"
+    commit_parser = snapshot_commands.add_parser(
+        "commit", help=commit_help, description=commit_help
+    )
+    commit_parser.add_argument("input_file", help="file containing the memories")
+    commit_parser.add_argument(
+        "-m", "--message", default="", help="description of the revision"
+    )
+    log_help = "list the revisions"
+    snapshot_commands.add_parser("log", help=log_help, description=log_help)
+    checkout_help = (
+        "render a revision, using the --to format and -o file given before 'snapshot'"
+    )
+    checkout_parser = snapshot_commands.add_parser(
+        "checkout", help=checkout_help, description=checkout_help
+    )
+    checkout_parser.add_argument(
+        "revision", type=int, nargs="?", help="revision id, default the latest"
+    )
+    snapshot_diff_help = "show what changed between two revisions"
+    snapshot_diff_parser = snapshot_commands.add_parser(
+        "diff", help=snapshot_diff_help, description=snapshot_diff_help
+    )
+    snapshot_diff_parser.add_argument("old_revision", type=int, help="old revision id")
+    snapshot_diff_parser.add_argument("new_revision", type=int, help="new revision id")
+    snapshot_diff_parser.add_argument(
+        "-j", "--json", action="store_true", help="output the differences as json"
+    )
+    return parser
+
+
+def _open_input(filename):
+    """open filename for reading, or use stdin if filename is None or '-'"""
     # the CSV module needs newline=''
-    if args.input_file:
-        with open(args.input_file, encoding="utf8", newline="") as fileobj:
-            memories = parser.parse(fileobj)
+    if filename and filename != "-":
+        return open(filename, encoding="utf8", newline="")
+    return contextlib.nullcontext(sys.stdin)
+
+
+def _open_output(filename):
+    """open filename for writing, or use stdout if filename is None or '-'"""
+    if filename and filename != "-":
+        return open(filename, mode="w", encoding="utf8", newline="\n")
+    return contextlib.nullcontext(sys.stdout)
+
+
+def _read_memories(filename, input_format, fields=None):
+    """parse memories from filename, or from stdin if filename is None or '-'
+
+    fields is passed to the parser to limit which Memory fields are translated
+    """
+    parser = hrpt.parsers.PARSERS[input_format]()
+    with _open_input(filename) as fileobj:
+        return parser.parse(fileobj, fields)
+
+
+def _convert(args, where, transforms):
+    """convert the input file to the output file"""
+    parser = hrpt.parsers.PARSERS[args.input_format]()
+    renderer = hrpt.renderers.RENDERERS[args.output_format]()
+    fields = renderer.FIELDS
+    if args.short_names:
+        fields = fields | {"name16"}
+    if where:
+        fields = fields | where.fields
+
+    # stream memories from the parser through the filters to the renderer
+    with _open_input(args.input_file) as infile:
+        memories = parser.iterparse(infile, fields)
+        memories = hrpt.filters.apply(memories, where, transforms)
+        if args.sort:
+            memories = hrpt.sorting.external_sort(
+                memories, args.sort, buffer_size=args.sort_buffer
+            )
+            if args.sort != "number" and renderer.BY_NUMBER:
+                memories = hrpt.sorting.renumber(memories)
+        if args.short_names:
+            memories = hrpt.abbreviations.ShortNamer().assign(
+                memories, buffer_size=args.sort_buffer
+            )
+        with _open_output(args.output_file) as outfile:
+            if args.jobs > 1:
+                hrpt.batch.render_parallel(
+                    renderer, memories, outfile, max_workers=args.jobs
+                )
+            else:
+                renderer.render(memories, outfile)
+
+    return EXIT_SUCCESS
+
+
+def _diff(args):
+    """show the differences between two sets of memories"""
+    try:
+        result = hrpt.diff.diff_memories(
+            _read_memories(args.old_file, args.input_format),
+            _read_memories(args.new_file, args.input_format),
+        )
+    except hrpt.models.DiffError as err:
+        print(f"hrpt: {err}", file=sys.stderr)
+        return EXIT_ERROR
+    _print_diff(result, args.json)
+    return EXIT_SUCCESS
+
+
+def _print_diff(result, as_json):
+    """print a MemoryDiff as text or json"""
+    if as_json:
+        json.dump(hrpt.diff.diff_as_json(result), sys.stdout, indent=2)
+        print()
     else:
-        memories = parser.parse(sys.stdin)
+        for line in hrpt.diff.diff_as_text(result):
+            print(line)
 
-    # TODO maybe the open should be encapsulated in the renderer?
-    renderer = hrpt.renderers.ADMS16Renderer()
-    if args.output_file:
-        with open(args.output_file, mode="w", encoding="utf8", newline="\n") as fileobj:
-            renderer.render(memories, fileobj)
+
+def _analyze(args):
+    """show intermod and adjacent channel problems"""
+    memories = _read_memories(args.input_file, args.input_format, {"frequency"})
+    results = hrpt.analyze.analyze(
+        memories, args.tolerance, args.spacing, args.limit or None
+    )
+    if args.json:
+        json.dump(hrpt.analyze.analysis_as_json(results), sys.stdout, indent=2)
+        print()
     else:
-        renderer.render(memories, sys.stdout)
+        for line in hrpt.analyze.analysis_as_text(results):
+            print(line)
+    return EXIT_SUCCESS
+
+
+def _batch(args):
+    """convert many files, recording progress in a journal"""
+    parser = hrpt.parsers.PARSERS[args.input_format]()
+    renderer = hrpt.renderers.RENDERERS[args.output_format]()
+    jobs = []
+    outputs = set()
+    for input_file in args.input_files:
+        name = os.path.splitext(os.path.basename(input_file))[0] + renderer.EXTENSION
+        output_file = os.path.join(args.output_dir, name)
+        if output_file in outputs:
+            print(
+                f"hrpt: more than one input file would write {output_file}",
+                file=sys.stderr,
+            )
+            return EXIT_ERROR
+        outputs.add(output_file)
+        jobs.append((input_file, output_file))
 
+    os.makedirs(args.output_dir, exist_ok=True)
+    journal_file = args.journal or os.path.join(args.output_dir, JOURNAL_NAME)
+    with hrpt.journal.Journal(journal_file) as journal:
+        if not args.resume:
+            journal.clear()
+        hrpt.batch.convert_files(
+            parser, renderer, jobs, max_workers=args.workers, journal=journal
+        )
     return EXIT_SUCCESS
 
 
+def _snapshot(args):
+    """commit, list, checkout, or diff revisions in a snapshot store"""
+    with hrpt.snapshots.SnapshotStore(args.store) as store:
+        if args.snapshot_command == "commit":
+            memories = _read_memories(args.input_file, args.input_format)
+            revision = store.commit(memories, args.message)
+            print(f"revision {revision}: {len(memories)} memories")
+        elif args.snapshot_command == "log":
+            for rev in store.revisions():
+                print(f"{rev.id} {rev.created} {rev.count} memories {rev.message}")
+        elif args.snapshot_command == "checkout":
+            revision = args.revision
+            if revision is None:
+                revision = store.latest()
+            try:
+                memories = store.checkout(revision)
+                renderer = hrpt.renderers.RENDERERS[args.output_format]()
+                with _open_output(args.output_file) as outfile:
+                    renderer.render(memories, outfile)
+            except KeyError as err:
+                print(f"hrpt: {err.args[0]}", file=sys.stderr)
+                return EXIT_ERROR
+        elif args.snapshot_command == "diff":
+            try:
+                result = store.diff(args.old_revision, args.new_revision)
+            except KeyError as err:
+                print(f"hrpt: {err.args[0]}", file=sys.stderr)
+                return EXIT_ERROR
+            except hrpt.models.DiffError as err:
+                print(f"hrpt: {err}", file=sys.stderr)
+                return EXIT_ERROR
+            _print_diff(result, args.json)
+    return EXIT_SUCCESS
+
+
+def main(argv=None):
+    """main function"""
+    argparser = _build_parser()
+    args = argparser.parse_args(argv)
+
+    if args.command == "diff":
+        return _diff(args)
+    if args.command == "analyze":
+        return _analyze(args)
+    if args.command == "batch":
+        return _batch(args)
+    if args.command == "snapshot":
+        return _snapshot(args)
+
+    if args.jobs < 1:
+        argparser.error("--jobs must be at least 1")
+    if args.sort_buffer < 1:
+        argparser.error("--sort-buffer must be at least 1")
+    try:
+        where = hrpt.filters.compile_where(args.where) if args.where else None
+        transforms = [hrpt.filters.compile_set(text) for text in args.transforms]
+    except hrpt.models.ExpressionError as err:
+        argparser.error(str(err))
+    return _convert(args, where, transforms)
+
+
 if __name__ == "__main__":  # pragma: nocover
     sys.exit(main())
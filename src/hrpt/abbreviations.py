@@ -0,0 +1,217 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module derives short memory names, like name6 and name8, from name16
+
+Radios with short displays can only show 6 or 8 characters. The long name is
+shortened by applying these rules in order, stopping as soon as it fits:
+
+    1. replace common words with their abbreviation, like Repeater -> RPT
+    2. remove spaces and punctuation between words
+    3. remove lower case vowels, except the first letter of each word, from
+       the end of the name backwards
+    4. truncate
+
+If two memories end up with the same short name, the later one has its name
+shortened further and a number appended, like RPT and RPT2. If the name ends
+in a digit a dash goes before the number, so CH 1 becomes CH 1-2 instead of
+CH 12, which looks like a different channel.
+"""
+
+import re
+
+from .sorting import DEFAULT_BUFFER_SIZE, spool
+
+# common words in memory names and their abbreviations, keys are lower case
+ABBREVIATIONS = {
+    "airport": "ARPT",
+    "amateur": "AMTR",
+    "association": "ASSN",
+    "calling": "CALL",
+    "canyon": "CYN",
+    "center": "CTR",
+    "channel": "CH",
+    "club": "CLB",
+    "county": "CO",
+    "department": "DEPT",
+    "east": "E",
+    "emergency": "EMRG",
+    "fort": "FT",
+    "hill": "HL",
+    "hospital": "HOSP",
+    "lake": "LK",
+    "mount": "MT",
+    "mountain": "MTN",
+    "national": "NATL",
+    "north": "N",
+    "peak": "PK",
+    "point": "PT",
+    "radio": "RAD",
+    "repeater": "RPT",
+    "ridge": "RDG",
+    "saint": "ST",
+    "simplex": "SPX",
+    "south": "S",
+    "university": "UNIV",
+    "valley": "VLY",
+    "weather": "WX",
+    "west": "W",
+}
+
+# a decimal point between digits is part of the word, so 1.25m doesn't become
+# 125m, which is a different band
+_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:(?<=[0-9])\.[0-9][A-Za-z0-9]*)*")
+# only lower case vowels, upper case letters are usually acronyms or call signs
+_VOWELS = frozenset("aeiou")
+
+
+class Abbreviator:
+    """Shorten names to fit a number of characters
+
+    Results are memoized, so abbreviating the same name again, which is
+    common across a fleet of radios with the same list, is a dictionary
+    lookup.
+    """
+
+    def __init__(self, abbreviations=None):
+        super().__init__()
+        if abbreviations is None:
+            abbreviations = ABBREVIATIONS
+        self.abbreviations = {
+            word.lower(): abbr for word, abbr in abbreviations.items()
+        }
+        self._cache = {}
+
+    def abbreviate(self, name, length):
+        """Return name shortened to at most length characters"""
+        try:
+            return self._cache[(name, length)]
+        except KeyError:
+            pass
+        short = self._abbreviate(name, length)
+        self._cache[(name, length)] = short
+        return short
+
+    def _abbreviate(self, name, length):
+        name = name.strip()
+        if len(name) <= length:
+            return name
+
+        # rule 1: replace words we have abbreviations for
+        words = _WORD_RE.findall(name)
+        words = [self.abbreviations.get(word.lower(), word) for word in words]
+        spaced = " ".join(words)
+        if len(spaced) <= length:
+            return spaced
+
+        # rule 2: remove the spaces and punctuation
+        joined = "".join(words)
+        if len(joined) <= length:
+            return joined
+
+        # rule 3: remove vowels, starting at the end of the name, but keep
+        # the first letter of every word
+        letters = [list(word) for word in words]
+        excess = len(joined) - length
+        for word in reversed(letters):
+            for index in range(len(word) - 1, 0, -1):
+                if excess and word[index] in _VOWELS:
+                    del word[index]
+                    excess -= 1
+        # rule 4: truncate whatever is left
+        return "".join("".join(word) for word in letters)[:length]
+
+
+class ShortNamer:
+    """Assign unique short names to a stream of memories
+
+    Each ShortNamer keeps track of the short names it has handed out, so use
+    a new one for each set of memories.
+    """
+
+    def __init__(self, abbreviator=None):
+        super().__init__()
+        self.abbreviator = abbreviator or Abbreviator()
+        # the names in use for each field
+        self._used = {"name6": set(), "name8": set()}
+
+    def unique(self, field, name, length):
+        """Return a short version of name not already used in field"""
+        used = self._used[field]
+        short = self.abbreviator.abbreviate(name, length)
+        suffix = 1
+        candidate = short
+        while candidate in used:
+            suffix += 1
+            candidate = _suffixed(short, suffix, length)
+        used.add(candidate)
+        return candidate
+
+    def assign(self, memories, buffer_size=DEFAULT_BUFFER_SIZE, tmpdir=None):
+        """Fill in name6 and name8 from name16 for each memory
+
+        Short names which are already set are kept, and can't be used by other
+        memories. To find them all, every memory is read before the first one
+        is yielded. Only buffer_size memories are held in memory, the rest are
+        spooled to a temporary file in tmpdir, see hrpt.sorting.spool(). If
+        more than one memory already has the same short name, the first one
+        keeps it and the others get a unique version of it.
+
+        This is a generator, it yields each memory after its names are set.
+        """
+        fields = (("name6", 6), ("name8", 8))
+        duplicates = set()
+
+        def reserve(memories):
+            """reserve the names which are already set as memories go by"""
+            for index, memory in enumerate(memories):
+                for field, _ in fields:
+                    current = getattr(memory, field)
+                    if not current:
+                        continue
+                    if current in self._used[field]:
+                        duplicates.add((index, field))
+                    else:
+                        self._used[field].add(current)
+                yield memory
+
+        memories = spool(reserve(memories), buffer_size, tmpdir)
+        for index, memory in enumerate(memories):
+            for field, length in fields:
+                current = getattr(memory, field)
+                if (index, field) in duplicates:
+                    setattr(memory, field, self.unique(field, current, length))
+                elif not current and memory.name16:
+                    setattr(memory, field, self.unique(field, memory.name16, length))
+            yield memory
+
+
+def _suffixed(name, suffix, length):
+    """Append a number to name, shortening name so it fits in length
+
+    If what's left of name ends in a digit, put a dash before the number so
+    they don't run together.
+    """
+    tail = str(suffix)
+    if name[: length - len(tail)][-1:].isdigit():
+        tail = f"-{tail}"
+    return name[: length - len(tail)] + tail
@@ -0,0 +1,135 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module parses and renders memories on asyncio streams
+
+Parsing and rendering are CPU bound, so to keep the event loop responsive they
+are done a bounded batch at a time, with a chance for other tasks to run
+between batches. Reading waits for the consumer of parse() to ask for more
+memories, and writing waits for the writer to drain, so a slow peer applies
+backpressure instead of filling up memory.
+
+Parsers and renderers keep no state between calls, so one instance can be
+shared by any number of concurrent conversions.
+"""
+
+import asyncio
+import collections
+
+# number of lines to read and parse, or memories or slots to render, before
+# giving other tasks a chance to run. The renderers' DEFAULT_CHUNK_SIZE is
+# sized for a process pool, and is too big to keep the event loop responsive
+DEFAULT_BATCH_SIZE = 200
+
+
+async def parse(reader, parser, fields=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Asynchronously generate Memory objects from an asyncio.StreamReader
+
+    parser is an instance of one of the classes in hrpt.parsers. fields is
+    passed to the parser, see CHIRPParser.parse(). The stream is decoded as
+    UTF-8. At most batch_size lines are read and parsed at a time.
+    """
+    line_number = 1
+    for _ in range(parser.HEADER_LINES):
+        if not await reader.readline():
+            return
+        line_number += 1
+
+    while True:
+        lines = []
+        while len(lines) < batch_size:
+            line = await reader.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf8"))
+        for memory in parser.parse_lines(lines, fields, line_number):
+            yield memory
+        if len(lines) < batch_size:
+            return
+        line_number += len(lines)
+        # readline() doesn't yield to the event loop if the data is already
+        # buffered, so make sure other tasks get a turn
+        await asyncio.sleep(0)
+
+
+async def render(memories, writer, renderer, chunk_size=None):
+    """Render memories to an asyncio.StreamWriter
+
+    memories can be an iterable or an async iterable. The output is rendered
+    one chunk at a time using the renderer's chunks() and render_chunk()
+    methods, and after each chunk we wait for the writer to drain. An async
+    iterable is read only far enough ahead to render the next chunk, so output
+    starts before the input ends. chunk_size is passed to renderer.chunks(),
+    if it's None DEFAULT_BATCH_SIZE is used. The output is encoded as UTF-8.
+
+    The writer is not closed.
+    """
+    if chunk_size is None:
+        chunk_size = DEFAULT_BATCH_SIZE
+    if not hasattr(memories, "__aiter__"):
+        for chunk in renderer.chunks(memories, chunk_size):
+            await _write_chunk(writer, renderer, chunk)
+        return
+
+    source = memories.__aiter__()
+    buffer = collections.deque()
+    exhausted = False
+
+    def buffered():
+        while buffer:
+            yield buffer.popleft()
+        if not exhausted:
+            raise RuntimeError("renderer read more memories than were buffered")
+
+    chunks = renderer.chunks(buffered(), chunk_size)
+    while True:
+        # chunks() only walks forward, and reads at most chunk_size + 1
+        # memories to produce each chunk
+        while not exhausted and len(buffer) <= chunk_size:
+            try:
+                buffer.append(await source.__anext__())
+            except StopAsyncIteration:
+                exhausted = True
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        await _write_chunk(writer, renderer, chunk)
+
+
+async def _write_chunk(writer, renderer, chunk):
+    """Render one chunk to writer and wait for it to drain"""
+    writer.write(renderer.render_chunk(chunk).encode("utf8"))
+    await writer.drain()
+    # drain() returns right away unless the buffer is full
+    await asyncio.sleep(0)
+
+
+async def convert(
+    reader, writer, parser, renderer, batch_size=DEFAULT_BATCH_SIZE, chunk_size=None
+):
+    """Parse memories from reader and render them to writer
+
+    Only the fields the renderer uses are parsed. batch_size is passed to
+    parse() and chunk_size to render(). The writer is not closed.
+    """
+    memories = parse(reader, parser, renderer.FIELDS, batch_size)
+    await render(memories, writer, renderer, chunk_size)
@@ -0,0 +1,270 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module looks for interference problems in a list of memories
+
+Two kinds of problems are found, for each band:
+
+    * intermodulation: a 3rd order product of two channels, 2 x f1 - f3, or
+      of three channels, f1 + f2 - f3, is within a tolerance of another
+      channel
+    * adjacent channels: two channels are closer together than a minimum
+      spacing
+
+A product f1 + f2 - f3 hits a victim when f1 + f2 is within the tolerance of
+f3 + victim, so intermod is found by sorting the sums of every pair of
+channels in a band and matching sums which are within the tolerance of each
+other. That takes time proportional to n^2 log n, plus the number of hits,
+and memory proportional to n^2, for n channels in the band. Adjacent channels
+are found by bisecting into the sorted frequencies.
+
+In a band full of evenly spaced channels nearly every combination of three
+channels hits a fourth, so the number of intermod hits grows with the cube of
+the number of channels. The search stops after a limit on the number of hits
+in each band.
+"""
+
+import bisect
+import dataclasses
+from typing import Dict, List, Tuple
+
+from .helpers import format_mhz
+from .models import Band, Frequency
+
+# default tolerance for an intermod product to hit a channel, in Hz
+DEFAULT_TOLERANCE = 5_000
+
+# default minimum spacing between channels, in Hz
+DEFAULT_SPACING = 15_000
+
+# default most intermod hits to find in each band
+DEFAULT_LIMIT = 1_000
+
+
+@dataclasses.dataclass
+class AdjacentHit:
+    """f1 and f2 are closer together than the minimum spacing"""
+
+    band: Band
+    f1: Frequency
+    f2: Frequency
+
+    @property
+    def spacing(self):
+        """how far apart the two frequencies are in Hz"""
+        return self.f2 - self.f1
+
+
+@dataclasses.dataclass
+class BandAnalysis:
+    """All the problems found in a single band
+
+    numbers maps each frequency in the band to the memory numbers which use it.
+    intermod is a list of tuples from find_intermod(), and intermod_truncated
+    is True if the search stopped at the limit.
+    """
+
+    band: Band
+    numbers: Dict[Frequency, List[int]]
+    intermod: List[Tuple[int, int, int, int, int]] = dataclasses.field(
+        default_factory=list
+    )
+    intermod_truncated: bool = False
+    adjacent: List[AdjacentHit] = dataclasses.field(default_factory=list)
+
+
+def numbers_by_band(memories):
+    """Return a dict of Band to a dict of frequency to a list of memory numbers"""
+    bands = {}
+    for memory in memories:
+        if memory.frequency:
+            numbers = bands.setdefault(memory.frequency.band, {})
+            numbers.setdefault(memory.frequency, []).append(memory.number)
+    return bands
+
+
+def find_intermod(frequencies, tolerance=DEFAULT_TOLERANCE, limit=None):
+    """Find 3rd order intermod products that land on a channel
+
+    frequencies must be sorted and unique. Both two signal products,
+    2 x f1 - f3, and three signal products, f1 + f2 - f3, are found.
+
+    The product f1 + f2 - f3 is within tolerance of victim exactly when the
+    pair sums f1 + f2 and f3 + victim are within tolerance of each other. We
+    sort the sum of every pair, including each channel with itself for the
+    two signal products, and slide a window of width tolerance along them.
+    Every two sums in the window which don't share a channel are hits.
+
+    Returns a list of (f1, f2, f3, product, victim) tuples, where product is
+    f1 + f2 - f3. f1 == f2 for two signal products. Tuples are much lighter
+    than objects when there are millions of hits. If limit is not None, the
+    search stops after that many hits.
+    """
+    hits = []
+    count = len(frequencies)
+    if count < 3:
+        return hits
+    # pack each pair sum and the indexes of its two channels into a single
+    # int, so the sums sort by value in C without a key function
+    scale = count * count
+    keys = [
+        (f1 + frequencies[j]) * scale + i * count + j
+        for i, f1 in enumerate(frequencies)
+        for j in range(i, count)
+    ]
+    keys.sort()
+
+    append = hits.append
+    start = 0
+    for index, key in enumerate(keys):
+        total, pair = divmod(key, scale)
+        i, j = divmod(pair, count)
+        # move the start of the window up to the first sum within tolerance
+        while keys[start] // scale < total - tolerance:
+            start += 1
+        for other in keys[start:index]:
+            other_total, other_pair = divmod(other, scale)
+            k, m = divmod(other_pair, count)
+            if k in (i, j) or m in (i, j):
+                continue
+            fi, fj, fk, fm = (frequencies[x] for x in (i, j, k, m))
+            # either pair can be the signals, and a pair of two different
+            # channels can be f3 and victim in either order
+            if k != m:
+                append((fi, fj, fk, total - fk, fm))
+                append((fi, fj, fm, total - fm, fk))
+            if i != j:
+                append((fk, fm, fi, other_total - fi, fj))
+                append((fk, fm, fj, other_total - fj, fi))
+            if limit is not None and len(hits) >= limit:
+                del hits[limit:]
+                return hits
+    return hits
+
+
+def find_adjacent(band, frequencies, spacing=DEFAULT_SPACING):
+    """Find pairs of channels which are closer together than spacing
+
+    frequencies must be sorted and unique.
+
+    Returns a list of AdjacentHit
+    """
+    hits = []
+    for index, f1 in enumerate(frequencies):
+        stop = bisect.bisect_left(frequencies, f1 + spacing, lo=index + 1)
+        for f2 in frequencies[index + 1 : stop]:
+            hits.append(AdjacentHit(band, f1, f2))
+    return hits
+
+
+def analyze(
+    memories,
+    tolerance=DEFAULT_TOLERANCE,
+    spacing=DEFAULT_SPACING,
+    limit=DEFAULT_LIMIT,
+):
+    """Look for intermod and adjacent channel problems in memories
+
+    limit is the most intermod hits to find in each band, or None for no
+    limit.
+
+    Returns a list of BandAnalysis, one for each band that has a memory in it,
+    in the order the bands are defined in Band.
+    """
+    bands = numbers_by_band(memories)
+    results = []
+    for band in Band:
+        if band not in bands:
+            continue
+        result = BandAnalysis(band, bands[band])
+        frequencies = sorted(result.numbers)
+        if limit is None:
+            result.intermod = find_intermod(frequencies, tolerance)
+        else:
+            # look for one more so we know if there were more than limit
+            hits = find_intermod(frequencies, tolerance, limit + 1)
+            result.intermod = hits[:limit]
+            result.intermod_truncated = len(hits) > limit
+        result.adjacent = find_adjacent(band, frequencies, spacing)
+        results.append(result)
+    return results
+
+
+def _describe(result, frequency):
+    numbers = ", ".join(str(number) for number in result.numbers[frequency])
+    return f"{format_mhz(frequency)} ({numbers})"
+
+
+def analysis_as_text(results):
+    """Generate lines of human readable text describing a list of BandAnalysis
+
+    Memory numbers are shown in parentheses after each frequency.
+    """
+    for result in results:
+        yield f"{result.band.value}: {len(result.numbers)} frequencies"
+        for f1, f2, f3, product, victim in result.intermod:
+            if f1 == f2:
+                signals = f"2 x {_describe(result, f1)}"
+            else:
+                signals = f"{_describe(result, f1)} + {_describe(result, f2)}"
+            yield (
+                f"  intermod: {signals} - {_describe(result, f3)}"
+                f" = {format_mhz(product)} hits {_describe(result, victim)}"
+            )
+        if result.intermod_truncated:
+            yield f"  intermod: stopped after {len(result.intermod)} hits"
+        for hit in result.adjacent:
+            yield (
+                f"  adjacent: {_describe(result, hit.f1)}"
+                f" and {_describe(result, hit.f2)}"
+                f" are {format_mhz(hit.spacing)} MHz apart"
+            )
+
+
+def analysis_as_json(results):
+    """Convert a list of BandAnalysis into a structure which json can serialize"""
+    return {
+        result.band.value: {
+            "intermod": [
+                {
+                    "f1": int(f1),
+                    "f2": int(f2),
+                    "f3": int(f3),
+                    "product": product,
+                    "victim": int(victim),
+                    "victim_numbers": result.numbers[victim],
+                }
+                for f1, f2, f3, product, victim in result.intermod
+            ],
+            "intermod_truncated": result.intermod_truncated,
+            "adjacent": [
+                {
+                    "f1": int(hit.f1),
+                    "f2": int(hit.f2),
+                    "spacing": int(hit.spacing),
+                    "numbers": result.numbers[hit.f1] + result.numbers[hit.f2],
+                }
+                for hit in result.adjacent
+            ],
+        }
+        for result in results
+    }
@@ -0,0 +1,162 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module converts many sets of memories at once, or one large set of
+memories on many processors
+
+Parsers and renderers keep all their state local to each parse() or render()
+call, so a single instance of each is shared by every conversion.
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import os
+import threading
+
+
+def convert(parser, renderer, infile, outfile):
+    """Stream memories from infile through parser and renderer to outfile
+
+    Only the fields the renderer uses are parsed.
+    """
+    renderer.render(parser.iterparse(infile, renderer.FIELDS), outfile)
+
+
+def convert_file(parser, renderer, input_path, output_path):
+    """Convert the file at input_path, writing the result to output_path
+
+    The output is written to a temporary file in the same directory, and
+    renamed to output_path when it's complete, so output_path is never left
+    half written.
+
+    Returns output_path
+    """
+    directory, name = os.path.split(os.fspath(output_path))
+    # unique for each thread in each process, so concurrent conversions of the
+    # same output don't collide
+    temp_name = f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    temp_path = os.path.join(directory, temp_name)
+    try:
+        # the CSV module needs newline=''
+        with open(input_path, encoding="utf8", newline="") as infile, open(
+            temp_path, mode="w", encoding="utf8", newline="\n"
+        ) as outfile:
+            convert(parser, renderer, infile, outfile)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+    return output_path
+
+
+def convert_files(parser, renderer, jobs, max_workers=None, journal=None):
+    """Convert many files concurrently in a pool of threads
+
+    jobs is an iterable of (input_path, output_path) tuples. parser and
+    renderer are shared by all the threads. max_workers is passed to
+    ThreadPoolExecutor.
+
+    If journal is a hrpt.journal.Journal, jobs whose output the journal says
+    was already produced from the same input are skipped, and every job that
+    completes is recorded in the journal as soon as it's done.
+
+    Returns a list of output paths in the same order as jobs. If any
+    conversion fails, the first exception is raised after all the others
+    have finished.
+    """
+    settings = (type(parser).__name__, type(renderer).__name__)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        hashes = {}
+        for input_path, output_path in jobs:
+            if journal is not None:
+                input_hash = journal.input_hash(input_path, *settings)
+                if journal.is_done(output_path, input_hash):
+                    futures.append(_finished(output_path))
+                    continue
+            future = executor.submit(
+                convert_file, parser, renderer, input_path, output_path
+            )
+            if journal is not None:
+                hashes[future] = input_hash
+            futures.append(future)
+        try:
+            # record each job in the journal as it finishes, from this thread
+            for future in concurrent.futures.as_completed(hashes):
+                if not future.exception():
+                    journal.record(future.result(), hashes[future])
+            concurrent.futures.wait(futures)
+        except BaseException:
+            # interrupted, probably by Ctrl-C, don't run the jobs which haven't
+            # started, their progress wouldn't be journaled anyway
+            for future in futures:
+                future.cancel()
+            raise
+        return [future.result() for future in futures]
+
+
+def _finished(result):
+    """Return a future which is already done"""
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+def render_parallel(renderer, memories, fileobj, chunk_size=None, max_workers=None):
+    """Render memories to fileobj using a pool of processes
+
+    The renderer splits memories into chunks with its chunks() method, each
+    chunk is rendered to a string in a worker process by render_chunk(), and
+    the strings are written to fileobj in order. The output is identical to
+    renderer.render(memories, fileobj).
+
+    chunk_size is passed to renderer.chunks(), if it's None the renderer's
+    default is used. max_workers is passed to ProcessPoolExecutor.
+
+    Chunks are pulled from memories only as fast as they are rendered and
+    written, at most two per worker are in flight at once, so memory use is
+    bounded no matter how many memories there are.
+    """
+    if chunk_size is None:
+        chunks = renderer.chunks(memories)
+    else:
+        chunks = renderer.chunks(memories, chunk_size)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    window = 2 * max_workers
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map() would submit every chunk before returning the first
+        # result, so keep our own window of futures, oldest first
+        pending = collections.deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(renderer.render_chunk, chunk))
+                if len(pending) >= window:
+                    fileobj.write(pending.popleft().result())
+            while pending:
+                fileobj.write(pending.popleft().result())
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
@@ -0,0 +1,263 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module compares two sets of memories and reports what changed between them
+"""
+
+import dataclasses
+import enum
+from typing import List
+
+from .helpers import format_mhz
+from .models import DiffError, Memory
+
+# the fields which make up a channel, regardless of where it is stored or what
+# it is called. If these match, it's the same channel.
+CHANNEL_FIELDS = (
+    "frequency",
+    "mode",
+    "offset",
+    "tx_ctcss_freq",
+    "rx_ctcss_freq",
+    "tx_dcs_code",
+    "rx_dcs_code",
+)
+
+# every field we compare, which is everything on Memory
+DIFF_FIELDS = tuple(f.name for f in dataclasses.fields(Memory))
+
+
+def channel_key(memory):
+    """Return a hashable key for the channel stored in a memory"""
+    return tuple(getattr(memory, name) for name in CHANNEL_FIELDS)
+
+
+@dataclasses.dataclass
+class FieldChange:
+    """A single field which has a different value in the old and new memory"""
+
+    field: str
+    old: object
+    new: object
+
+
+@dataclasses.dataclass
+class MemoryChange:
+    """A memory which was moved or modified, with field level detail"""
+
+    old: Memory
+    new: Memory
+    changes: List[FieldChange]
+
+
+@dataclasses.dataclass
+class MemoryDiff:
+    """The differences between two sets of memories
+
+    added and removed contain Memory objects, moved and modified contain
+    MemoryChange objects. A moved memory has the same channel in a different
+    memory number, and may also have other changes, like a new name.
+    """
+
+    added: List[Memory] = dataclasses.field(default_factory=list)
+    removed: List[Memory] = dataclasses.field(default_factory=list)
+    moved: List[MemoryChange] = dataclasses.field(default_factory=list)
+    modified: List[MemoryChange] = dataclasses.field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved or self.modified)
+
+
+def field_changes(old, new):
+    """Return a list of FieldChange for every field that differs"""
+    changes = []
+    for name in DIFF_FIELDS:
+        old_value = getattr(old, name)
+        new_value = getattr(new, name)
+        if old_value != new_value:
+            changes.append(FieldChange(name, old_value, new_value))
+    return changes
+
+
+def diff_memories(old_memories, new_memories):
+    """Compare two iterables of memories and return a MemoryDiff
+
+    Both sets are indexed by memory number and by channel_key(), so memories
+    are matched with dictionary lookups, never a pairwise comparison. The
+    memories which don't match by number are sorted so moves are paired up
+    in order, which makes this O(n log n) in the worst case. Memories are
+    matched in this order:
+
+        1. same number and same channel: modified if any field differs
+        2. same channel in a different number: moved
+        3. same number with a different channel: modified
+        4. anything left over is added or removed
+
+    Raises DiffError if more than one memory in either set has the same
+    number, because we can't tell which one is meant.
+    """
+    old_by_number = _index_by_number(old_memories, "old")
+    new_by_number = _index_by_number(new_memories, "new")
+    result = MemoryDiff()
+
+    pending_old = {}
+    pending_new = {}
+    for number, old in old_by_number.items():
+        new = new_by_number.get(number)
+        if new is None:
+            pending_old[number] = old
+        elif old == new:
+            continue
+        elif channel_key(old) == channel_key(new):
+            result.modified.append(MemoryChange(old, new, field_changes(old, new)))
+        else:
+            pending_old[number] = old
+            pending_new[number] = new
+    for number, new in new_by_number.items():
+        if number not in old_by_number:
+            pending_new[number] = new
+
+    # index the unmatched old memories by channel so we can find moves
+    old_by_channel = {}
+    for number in sorted(pending_old, reverse=True):
+        old = pending_old[number]
+        old_by_channel.setdefault(channel_key(old), []).append(old)
+    for number in sorted(pending_new):
+        new = pending_new[number]
+        candidates = old_by_channel.get(channel_key(new))
+        if candidates:
+            # lowest memory number first, that's why we built the list in reverse
+            old = candidates.pop()
+            result.moved.append(MemoryChange(old, new, field_changes(old, new)))
+            del pending_old[old.number]
+            del pending_new[number]
+
+    for number in sorted(pending_old.keys() | pending_new.keys()):
+        old = pending_old.get(number)
+        new = pending_new.get(number)
+        if old and new:
+            result.modified.append(MemoryChange(old, new, field_changes(old, new)))
+        elif old:
+            result.removed.append(old)
+        else:
+            result.added.append(new)
+
+    result.modified.sort(key=lambda change: change.new.number)
+    return result
+
+
+def _index_by_number(memories, which):
+    """Return a dict of memory number to memory, raise DiffError on duplicates"""
+    by_number = {}
+    duplicates = set()
+    for memory in memories:
+        if memory.number in by_number:
+            duplicates.add(memory.number)
+        by_number[memory.number] = memory
+    if duplicates:
+        numbers = ", ".join(str(number) for number in sorted(duplicates))
+        raise DiffError(f"Duplicate memory numbers in {which} memories: {numbers}")
+    return by_number
+
+
+def _value_as_str(name, value):
+    """Render a field value for human consumption"""
+    if value is None:
+        return ""
+    if name in ("frequency", "offset"):
+        return format_mhz(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+def _value_as_json(value):
+    """Make a field value safe for json"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, int):
+        # Frequency is a subclass of int, json wants the real thing
+        return int(value)
+    return value
+
+
+def _memory_as_json(memory):
+    return {name: _value_as_json(getattr(memory, name)) for name in DIFF_FIELDS}
+
+
+def _change_as_json(change):
+    return {
+        "old_number": change.old.number,
+        "new_number": change.new.number,
+        "changes": [
+            {
+                "field": fc.field,
+                "old": _value_as_json(fc.old),
+                "new": _value_as_json(fc.new),
+            }
+            for fc in change.changes
+        ],
+    }
+
+
+def diff_as_json(result):
+    """Convert a MemoryDiff into a structure which can be serialized by json"""
+    return {
+        "added": [_memory_as_json(memory) for memory in result.added],
+        "removed": [_memory_as_json(memory) for memory in result.removed],
+        "moved": [_change_as_json(change) for change in result.moved],
+        "modified": [_change_as_json(change) for change in result.modified],
+    }
+
+
+def _describe(memory):
+    frequency = _value_as_str("frequency", memory.frequency)
+    parts = [str(memory.number), memory.name16, frequency]
+    return " ".join(part for part in parts if part)
+
+
+def diff_as_text(result):
+    """Generate lines of human readable text describing a MemoryDiff
+
+    added lines start with '+', removed with '-', moved with '>', and
+    modified with '~'. Field level changes are indented under moved and
+    modified memories.
+    """
+    for memory in result.added:
+        yield f"+ {_describe(memory)}"
+    for memory in result.removed:
+        yield f"- {_describe(memory)}"
+    for change in result.moved:
+        yield f"> {change.old.number} -> {_describe(change.new)}"
+        yield from _field_lines(change, skip=("number",))
+    for change in result.modified:
+        yield f"~ {_describe(change.new)}"
+        yield from _field_lines(change)
+
+
+def _field_lines(change, skip=()):
+    for fc in change.changes:
+        if fc.field in skip:
+            continue
+        old = _value_as_str(fc.field, fc.old)
+        new = _value_as_str(fc.field, fc.new)
+        yield f"    {fc.field}: '{old}' -> '{new}'"
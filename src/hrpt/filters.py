@@ -0,0 +1,464 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module compiles filter and transform expressions over Memory fields
+
+A filter expression selects memories, for example:
+
+    band in (2m, 70cm) and tx_ctcss_freq
+    mode == NFM and len(name16) < 8
+    frequency >= 146.4MHz and not frequency > 146.6MHz
+
+Expressions are made of:
+
+    * field names from Memory, plus 'band' which is the name of the band the
+      frequency is in
+    * numbers, with an optional unit of Hz, kHz, or MHz. Numbers with a unit
+      are converted to an integer in Hz, which is how frequencies and offsets
+      are stored. Frequencies and offsets can only be compared with whole
+      numbers of Hz, so use a unit: frequency > 146.6 is an error
+    * bare words like 2m or NFM, or quoted strings, which are compared against
+      the value of a field. Enum fields like mode compare by their value.
+      Name fields are compared with the text exactly as written, so 007 is
+      the string '007', not the number 7
+    * comparisons: == != < <= > >= in, not in
+    * len(field) for the length of a field
+    * and, or, not, and parentheses for grouping
+    * a bare field is true if it has a value
+
+A transform expression sets a field to a literal value, for example:
+
+    mode=NFM
+    name16='Simplex'
+    offset=0
+
+The expressions are parsed once, and compiled into nested closures, so
+applying them to a memory is a handful of function calls, not an
+interpretation of the expression text.
+"""
+
+import dataclasses
+import enum
+import operator
+import re
+
+from .helpers import parse_mhz
+from .models import ExpressionError, Frequency, Memory, Mode, ParseError
+
+MEMORY_FIELDS = frozenset(f.name for f in dataclasses.fields(Memory))
+
+# fields which are calculated from other fields, and the field they are
+# calculated from
+VIRTUAL_FIELDS = {"band": "frequency"}
+
+KEYWORDS = frozenset({"and", "or", "not", "in", "len"})
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _hertz(value):
+    """Frequencies and offsets must be whole numbers of Hz, use a unit like MHz"""
+    if not isinstance(value, int):
+        raise ValueError(f"'{value}' is not an integer number of Hz")
+    return value
+
+
+# fields which hold text, literals are used exactly as they were written
+STRING_FIELDS = frozenset({"name6", "name8", "name16", "description", "band"})
+
+# fields which hold a whole number of Hz
+HERTZ_FIELDS = frozenset({"frequency", "offset"})
+
+# how to turn a literal into a value for each field when we set it, string
+# fields are passed the literal as it was written
+SETTERS = {
+    "number": int,
+    "frequency": lambda value: Frequency(_hertz(value)),
+    "mode": Mode,
+    "offset": _hertz,
+    "tx_ctcss_freq": float,
+    "rx_ctcss_freq": float,
+    "tx_dcs_code": int,
+    "rx_dcs_code": int,
+    "name6": str,
+    "name8": str,
+    "name16": str,
+    "description": str,
+}
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<op>==|!=|<=|>=|<|>|=|\(|\)|,)
+        |(?P<string>'[^']*'|"[^"]*")
+        |(?P<word>[A-Za-z0-9_.+-]+)
+    )
+    """,
+    re.VERBOSE,
+)
+
+_NUMBER_RE = re.compile(r"(?P<number>-?\d+(?:\.\d*)?|-?\.\d+)(?P<unit>[A-Za-z]*)")
+
+_UNITS = {"hz": 0, "khz": 3, "mhz": 6}
+
+
+def _tokenize(text):
+    """Split an expression into a list of (kind, value, text) tuples
+
+    text is the token as it was written, without quotes, so a literal like
+    007 has a value of 7 and a text of '007'.
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ExpressionError(f"Unexpected character at '{text[pos:]}'")
+        pos = match.end()
+        if match.group("op"):
+            tokens.append(("op", match.group("op"), match.group("op")))
+        elif match.group("string"):
+            string = match.group("string")[1:-1]
+            tokens.append(("literal", string, string))
+        else:
+            word = match.group("word")
+            tokens.append((*_classify(word), word))
+    return tokens
+
+
+def _classify(word):
+    """Turn a bare word into a keyword, field, or literal token"""
+    if word in KEYWORDS:
+        return ("keyword", word)
+    if word in MEMORY_FIELDS or word in VIRTUAL_FIELDS:
+        return ("field", word)
+    match = _NUMBER_RE.fullmatch(word)
+    if match:
+        number = match.group("number")
+        unit = match.group("unit").lower()
+        if not unit:
+            if "." in number:
+                return ("literal", float(number))
+            return ("literal", int(number))
+        if unit in _UNITS:
+            sign, number = (-1, number[1:]) if number[0] == "-" else (1, number)
+            try:
+                # parse_mhz does exact fixed point math in MHz, so shift the
+                # decimal point to get the unit we want
+                hz, fraction = divmod(parse_mhz(number), 10 ** (6 - _UNITS[unit]))
+            except ParseError as err:
+                raise ExpressionError(f"Invalid number '{word}'") from err
+            if fraction:
+                raise ExpressionError(f"'{word}' is more precise than 1 Hz")
+            return ("literal", sign * hz)
+    if word[0] in "-.0123456789" and word.lower().endswith("hz"):
+        raise ExpressionError(f"Invalid number '{word}'")
+    # anything else is a string, like 2m or NFM
+    return ("literal", word)
+
+
+def _field_getter(name):
+    """Return a function which gets the comparable value of a field"""
+    if name == "band":
+
+        def getter(memory):
+            if memory.frequency is None:
+                return None
+            return memory.frequency.band.value
+
+        return getter
+
+    def getter(memory):
+        value = getattr(memory, name)
+        if isinstance(value, enum.Enum):
+            return value.value
+        return value
+
+    return getter
+
+
+class _Compiler:
+    """Recursive descent parser that turns tokens into closures
+
+    Every parse_* method returns a function which takes a Memory. The names
+    of the fields used by the expression are collected in self.fields.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.fields = set()
+        # count of field references, so we can tell if a comparison has any
+        self.field_count = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None, None)
+
+    def accept(self, kind, value=None):
+        """Consume and return the next token if it matches, otherwise None"""
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return token
+        return None
+
+    def expect(self, kind, value=None):
+        """Consume and return the next token, raise an error if it doesn't match"""
+        token = self.accept(kind, value)
+        if token is None:
+            self.unexpected(value or kind)
+        return token
+
+    def unexpected(self, expected):
+        found = self.peek()[1]
+        if found is None:
+            raise ExpressionError(
+                f"Expected '{expected}' at end of expression '{self.text}'"
+            )
+        raise ExpressionError(
+            f"Expected '{expected}' but found '{found}' in '{self.text}'"
+        )
+
+    def compile(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        func = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(
+                f"Unexpected '{self.peek()[1]}' in expression '{self.text}'"
+            )
+        return func
+
+    def parse_or(self):
+        funcs = [self.parse_and()]
+        while self.accept("keyword", "or"):
+            funcs.append(self.parse_and())
+        if len(funcs) == 1:
+            return funcs[0]
+        return lambda memory: any(func(memory) for func in funcs)
+
+    def parse_and(self):
+        funcs = [self.parse_not()]
+        while self.accept("keyword", "and"):
+            funcs.append(self.parse_not())
+        if len(funcs) == 1:
+            return funcs[0]
+        return lambda memory: all(func(memory) for func in funcs)
+
+    def parse_not(self):
+        if self.accept("keyword", "not"):
+            func = self.parse_not()
+            return lambda memory: not func(memory)
+        if self.accept("op", "("):
+            func = self.parse_or()
+            self.expect("op", ")")
+            return func
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        field_count = self.field_count
+        func = self._parse_comparison()
+        if self.field_count == field_count:
+            raise ExpressionError(
+                f"Comparison without a field in expression '{self.text}'"
+            )
+        return func
+
+    def _parse_comparison(self):
+        left, left_field, left_literal = self.parse_operand()
+        token = self.peek()
+        if token[0] == "op" and token[1] in COMPARISONS:
+            self.pos += 1
+            compare = COMPARISONS[token[1]]
+            right, right_field, right_literal = self.parse_operand()
+            # literals take the type of the field they are compared with
+            if left_field and right_literal:
+                right = _constant(self.literal_value(left_field, right_literal))
+            if right_field and left_literal:
+                left = _constant(self.literal_value(right_field, left_literal))
+
+            def comparison(memory):
+                a = left(memory)
+                b = right(memory)
+                if a is None or b is None:
+                    # None is only equal to None, and can't be ordered
+                    return compare in (operator.eq, operator.ne) and compare(a, b)
+                try:
+                    return compare(a, b)
+                except TypeError:
+                    return False
+
+            return comparison
+        negate = False
+        if self.accept("keyword", "not"):
+            negate = True
+            self.expect("keyword", "in")
+        elif not self.accept("keyword", "in"):
+            # a bare operand is a truth test
+            return lambda memory: bool(left(memory))
+        choices = frozenset(
+            self.literal_value(left_field, literal)
+            for literal in self.parse_literal_list()
+        )
+        if negate:
+            return lambda memory: left(memory) not in choices
+        return lambda memory: left(memory) in choices
+
+    def parse_literal_list(self):
+        """Return a list of literal tokens in parentheses"""
+        self.expect("op", "(")
+        literals = [self.expect("literal")]
+        while self.accept("op", ","):
+            literals.append(self.expect("literal"))
+        self.expect("op", ")")
+        return literals
+
+    def parse_operand(self):
+        """Return a tuple of (function, field name, literal token)
+
+        field name is set if the operand is a field, and literal token if
+        it is a literal, so a literal can be converted to suit the field it is
+        compared with.
+        """
+        if self.accept("keyword", "len"):
+            self.expect("op", "(")
+            getter = self.parse_field()
+            self.expect("op", ")")
+
+            def length(memory):
+                value = getter(memory)
+                return len(value) if value is not None else 0
+
+            return (length, None, None)
+        token = self.accept("literal")
+        if token:
+            return (_constant(token[1]), None, token)
+        if self.peek()[0] != "field":
+            self.unexpected("field or value")
+        name = self.peek()[1]
+        return (self.parse_field(), name, None)
+
+    def literal_value(self, field, token):
+        """Convert a literal token to the type of field
+
+        String fields get the literal as it was written, and Hz fields only
+        accept whole numbers of Hz.
+        """
+        _, value, text = token
+        if field in STRING_FIELDS:
+            return text
+        if field in HERTZ_FIELDS:
+            try:
+                return _hertz(value)
+            except ValueError as err:
+                raise ExpressionError(
+                    f"{err}, use a unit like MHz in '{self.text}'"
+                ) from err
+        return value
+
+    def parse_field(self):
+        name = self.expect("field")[1]
+        self.fields.add(VIRTUAL_FIELDS.get(name, name))
+        self.field_count += 1
+        return _field_getter(name)
+
+
+def _constant(value):
+    """Return a function which takes a memory and returns value"""
+    return lambda memory: value
+
+
+def compile_where(text):
+    """Compile a filter expression into a function which takes a Memory
+
+    The function returns True if the memory matches the expression. The
+    function has a fields attribute, which is a frozenset of the Memory fields
+    the expression reads, so they can be passed to a parser.
+
+    Raises ExpressionError if the expression is invalid.
+    """
+    compiler = _Compiler(text)
+    predicate = compiler.compile()
+    predicate.fields = frozenset(compiler.fields)
+    return predicate
+
+
+def compile_set(text):
+    """Compile a 'field=value' transform into a function which takes a Memory
+
+    The function sets the field on the memory it is passed. An empty value,
+    as in 'tx_ctcss_freq=', sets the field to None.
+
+    Raises ExpressionError if the expression is invalid.
+    """
+    name, sep, value = text.partition("=")
+    name = name.strip()
+    value = value.strip()
+    if not sep or name not in SETTERS:
+        raise ExpressionError(f"Expected 'field=value' but found '{text}'")
+    if value:
+        tokens = _tokenize(value)
+        if len(tokens) != 1 or tokens[0][0] == "op":
+            raise ExpressionError(f"Invalid value '{value}' in '{text}'")
+        _, literal, literal_text = tokens[0]
+        if name in STRING_FIELDS:
+            literal = literal_text
+        try:
+            value = SETTERS[name](literal)
+        except (TypeError, ValueError) as err:
+            raise ExpressionError(
+                f"Invalid value '{value}' for field '{name}'"
+            ) from err
+    else:
+        value = None
+
+    def setter(memory):
+        setattr(memory, name, value)
+
+    return setter
+
+
+def apply(memories, where=None, transforms=()):
+    """Filter and transform memories as they stream past
+
+    where is a function from compile_where(), or None to keep every memory.
+    transforms is a sequence of functions from compile_set(), which are applied
+    in order to every memory which matches where.
+
+    This is a generator, it yields memories one at a time.
+    """
+    for memory in memories:
+        if where is None or where(memory):
+            for transform in transforms:
+                transform(memory)
+            yield memory
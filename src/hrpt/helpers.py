@@ -23,6 +23,11 @@
 This module contains a number of useful helper functions
 """
 
+from .models import ParseError
+
+# number of digits to the right of the decimal point to get from MHz to Hz
+MHZ_PLACES = 6
+
 
 def standard_offset(frequency):
     """Calculate the standard offset for a given frequency
@@ -50,3 +55,39 @@ def standard_offset(frequency):
         offset = 600_000
 
     return offset
+
+
+def parse_mhz(value):
+    """Parse a decimal string in MHz, like '447.100000', into an integer in Hz
+
+    This is fixed point: the digits on either side of the decimal point are
+    joined and padded, so there is no float in the middle to round 146.52
+    down to 146.519999. More than 6 decimal places are only allowed if the
+    extra digits are zeros, because we don't store fractions of a Hz.
+
+    Raises ParseError if value isn't an unsigned decimal number.
+    """
+    whole, _, fraction = value.partition(".")
+    digits = whole + fraction
+    if not digits or not digits.isascii() or not digits.isdigit():
+        raise ParseError(f"'{value}' is not a valid frequency in MHz")
+    if len(fraction) > MHZ_PLACES:
+        if fraction[MHZ_PLACES:].strip("0"):
+            raise ParseError(f"'{value}' is more precise than 1 Hz")
+        fraction = fraction[:MHZ_PLACES]
+    return int(whole + fraction.ljust(MHZ_PLACES, "0"))
+
+
+def format_mhz(hz, places=MHZ_PLACES):
+    """Format an integer in Hz as a decimal string in MHz
+
+    places is the number of digits after the decimal point, from 0 to 6. If
+    places is less than 6 the value is rounded half up, using integer math
+    so the result is exact.
+    """
+    scale = 10 ** (MHZ_PLACES - places)
+    sign = "-" if hz < 0 else ""
+    whole, fraction = divmod((abs(hz) + scale // 2) // scale, 10**places)
+    if places:
+        return f"{sign}{whole}.{fraction:0{places}d}"
+    return f"{sign}{whole}"
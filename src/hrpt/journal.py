@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module keeps a journal of completed conversions so batches can be resumed
+
+The journal is a SQLite database in write-ahead log mode. Each completed output
+is recorded with a hash of its input, in its own small transaction, so if a
+long batch dies part way through, everything recorded before that is kept,
+and a restart can skip it.
+"""
+
+import hashlib
+import os
+import sqlite3
+
+
+class Journal:
+    """A persistent record of which outputs have been produced from which inputs
+
+    Can be used as a context manager, which closes the journal on exit.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # in WAL mode NORMAL is still safe from corruption, and it avoids
+        # an fsync for every record
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS completed ("
+                " output TEXT PRIMARY KEY,"
+                " input_hash TEXT NOT NULL"
+                ")"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the journal"""
+        self._connection.close()
+
+    @staticmethod
+    def input_hash(input_path, *settings):
+        """Hash the contents of input_path, and any settings which affect the output
+
+        settings are converted to strings, so they can be anything which
+        has a stable string representation, like a class name.
+        """
+        digest = hashlib.sha256()
+        for setting in settings:
+            digest.update(str(setting).encode("utf8"))
+            digest.update(b"\0")
+        with open(input_path, "rb") as fileobj:
+            for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def is_done(self, output_path, input_hash):
+        """True if output_path was produced from an input with input_hash,
+        and output_path still exists"""
+        row = self._connection.execute(
+            "SELECT input_hash FROM completed WHERE output = ?",
+            (os.fspath(output_path),),
+        ).fetchone()
+        return row is not None and row[0] == input_hash and os.path.exists(output_path)
+
+    def record(self, output_path, input_hash):
+        """Record that output_path has been produced from an input with input_hash"""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completed (output, input_hash) VALUES (?, ?)",
+                (os.fspath(output_path), input_hash),
+            )
+
+    def clear(self):
+        """Forget everything in the journal"""
+        with self._connection:
+            self._connection.execute("DELETE FROM completed")
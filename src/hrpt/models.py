@@ -35,6 +35,14 @@ class RenderError(ValueError):
     """Raised when a renderer encounters a situation is doesn't know how to render"""
 
 
+class ExpressionError(ValueError):
+    """Raised when a filter or transform expression can not be compiled"""
+
+
+class DiffError(ValueError):
+    """Raised when two sets of memories can not be compared"""
+
+
 class Mode(enum.Enum):
     """Enumeration of operating modes"""
 
@@ -24,7 +24,11 @@ This module contains all parser classes for the incoming file formats
 """
 
 import csv
+import dataclasses
+import json
+import math
 
+from .helpers import parse_mhz
 from .models import (
     Frequency,
     Memory,
@@ -49,31 +53,95 @@ class CHIRPParser:
 
     """
 
-    def __init__(self):
-        super().__init__()
-        self.line_number = 0
+    # number of lines before the memories start
+    HEADER_LINES = 1
 
-    def parse(self, fileobj):
-        """Parse a CHIRP CSV export into a list of Memory objects"""
-        memories = []
+    # the parse_* method which sets each Memory field, number is always parsed
+    FIELD_PARSERS = {
+        "frequency": "parse_frequency",
+        "mode": "parse_mode",
+        "offset": "parse_offset",
+        "tx_ctcss_freq": "parse_squelch",
+        "tx_dcs_code": "parse_squelch",
+        "name16": "parse_name",
+    }
+
+    def parse(self, fileobj, fields=None):
+        """Parse a CHIRP CSV export into a list of Memory objects
+
+        fields is an optional collection of Memory field names, usually the
+        FIELDS of the renderer the memories are going to. Only those fields
+        are translated, the rest are left at their defaults. If fields is None
+        every field is translated.
+        """
+        return list(self.iterparse(fileobj, fields))
+
+    def iterparse(self, fileobj, fields=None):
+        """Generate Memory objects one at a time from a CHIRP CSV export
+
+        Same as parse(), but only one row is in memory at a time, so this can
+        stream arbitrarily large files.
+
+        All the state for a parse is local to this call, so one parser can be
+        used for many files at once, including from multiple threads.
+        """
         reader = csv.reader(fileobj)
-        # discard the header row
-        self.line_number += 1
-        _ = next(reader)
-        # iterate through the rest of the file
-        for row in reader:
-            self.line_number += 1
-            # row contains a list of strings
-            number = self.translate_number(row[0])
-            m = Memory(number)
-            m.frequency = self.translate_frequency(row[2])
-            m.mode = self.translate_mode(row[12])
-            m.offset = self.translate_offset(row[3], row[4])
-            self.parse_squelch(row, m)
-            m.name16 = row[1]
-            memories.append(m)
-
-        return memories
+        # discard the header row, an empty file has no memories
+        if next(reader, None) is None:
+            return
+        # iterate through the rest of the file, the header was line 1
+        yield from self._parse_rows(reader, self.field_parsers(fields), 2)
+
+    def parse_lines(self, lines, fields=None, first_line_number=2):
+        """Generate Memory objects from some lines after the header
+
+        Used to parse a file a few lines at a time, the caller is responsible
+        for skipping the HEADER_LINES. first_line_number is the line number
+        in the file of the first line, used for error messages.
+        """
+        reader = csv.reader(lines)
+        yield from self._parse_rows(
+            reader, self.field_parsers(fields), first_line_number
+        )
+
+    def _parse_rows(self, reader, parsers, first_line_number):
+        for line_number, row in enumerate(reader, start=first_line_number):
+            try:
+                yield self.parse_row(row, parsers)
+            except (ValueError, IndexError) as err:
+                raise ParseError(f"Line {line_number}: {err}") from err
+
+    def parse_row(self, row, parsers):
+        """Create a Memory from a row, which is a list of strings
+
+        parsers is the list of methods from field_parsers()
+        """
+        m = Memory(self.translate_number(row[0]))
+        for parser in parsers:
+            parser(row, m)
+        return m
+
+    def field_parsers(self, fields=None):
+        """Return the list of parse_* methods needed to populate fields"""
+        names = []
+        for field_name, method_name in self.FIELD_PARSERS.items():
+            if fields is not None and field_name not in fields:
+                continue
+            if method_name not in names:
+                names.append(method_name)
+        return [getattr(self, name) for name in names]
+
+    def parse_frequency(self, row, memory):
+        """Parse and set the frequency"""
+        memory.frequency = self.translate_frequency(row[2])
+
+    def parse_mode(self, row, memory):
+        """Parse and set the mode"""
+        memory.mode = self.translate_mode(row[12])
+
+    def parse_offset(self, row, memory):
+        """Parse and set the offset"""
+        memory.offset = self.translate_offset(row[3], row[4])
 
     def parse_squelch(self, row, memory):
         """Parse and set the CTCSS and DCS squelch"""
@@ -82,13 +150,17 @@ class CHIRPParser:
         if row[5] == "DTCS":
             memory.tx_dcs_code = self.translate_dcs(row[8])
 
+    def parse_name(self, row, memory):
+        """Parse and set the name"""
+        memory.name16 = row[1]
+
     def translate_number(self, value):
         """Translate memory number from a string to an integer"""
         return int(value)
 
     def translate_frequency(self, value):
         """Translate frequency from a string to a Frequency"""
-        return Frequency(int(float(value) * 1_000_000))
+        return Frequency(parse_mhz(value))
 
     def translate_mode(self, value):
         """Translate the mode to the proper enum"""
@@ -96,22 +168,126 @@ class CHIRPParser:
             return Mode.FM
         elif value == Mode.NARROW_FM.value:
             return Mode.NARROW_FM
-        raise ParseError("Unknown Mode '{value}' on line {self.line_number}")
+        raise ParseError(f"Unknown Mode '{value}'")
 
     def translate_offset(self, direction, value):
         """Create the offset from two string fields"""
         if direction == "+" and value:
             # positive offset, turn value into an integer in Hz
-            return int(float(value) * 1_000_000)
+            return parse_mhz(value)
         if direction == "-" and value:
             # negative offset, turn value into a negative integer in Hz
-            return int(float(value) * 1_000_000) * -1
+            return parse_mhz(value) * -1
         return 0
 
     def translate_ctcss(self, value):
         """CHIRP stores CTCSS tones as strings in Hz, we store float of Hz"""
-        return float(value)
+        tone = float(value)
+        if not math.isfinite(tone):
+            raise ParseError(f"'{value}' is not a valid CTCSS tone")
+        return tone
 
     def translate_dcs(self, value):
         """CHIRP stores DCS codes as string, we store them as integers"""
         return int(value)
+
+
+class JSONLinesParser:
+    """A class to parse memories in JSON Lines format
+
+    This is hrpt's own interchange format, written by JSONLinesRenderer, so that
+    hrpt processes can be piped together without losing anything. It has the
+    following characteristics:
+        * one JSON object per line, one line per memory
+        * keys are Memory field names
+        * frequencies and offsets are integers in Hz, mode is the Mode value
+        * blank lines are ignored, as are keys which aren't Memory fields
+
+    See https://jsonlines.org/
+    """
+
+    # every field on Memory
+    FIELDS = tuple(f.name for f in dataclasses.fields(Memory))
+
+    # number of lines before the memories start
+    HEADER_LINES = 0
+
+    def parse(self, fileobj, fields=None):
+        """Parse JSON Lines into a list of Memory objects
+
+        fields is an optional collection of Memory field names to populate,
+        if None every field is populated.
+        """
+        return list(self.iterparse(fileobj, fields))
+
+    def iterparse(self, fileobj, fields=None):
+        """Generate Memory objects one line at a time"""
+        yield from self.parse_lines(fileobj, fields)
+
+    def parse_lines(self, lines, fields=None, first_line_number=1):
+        """Generate Memory objects from some of the lines in a file
+
+        first_line_number is the line number in the file of the first line,
+        used for error messages.
+        """
+        names = [name for name in self.FIELDS if fields is None or name in fields]
+        for line_number, line in enumerate(lines, start=first_line_number):
+            if not line.strip():
+                continue
+            try:
+                yield self.parse_line(line, names)
+            except (ValueError, TypeError, KeyError) as err:
+                raise ParseError(f"Line {line_number}: {err}") from err
+
+    def parse_line(self, line, names):
+        """Create a Memory from one line of JSON, setting only the fields in names"""
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ParseError("Expected a JSON object")
+        memory = Memory(self.translate_integer(data["number"]))
+        for name in names:
+            value = data.get(name)
+            if value is None or name == "number":
+                continue
+            if name == "frequency":
+                value = Frequency(self.translate_integer(value))
+            elif name == "mode":
+                value = Mode(value)
+            elif name in ("offset", "tx_dcs_code", "rx_dcs_code"):
+                value = self.translate_integer(value)
+            elif name in ("tx_ctcss_freq", "rx_ctcss_freq"):
+                value = self.translate_float(value)
+            elif name in ("name6", "name8", "name16", "description"):
+                value = self.translate_string(value)
+            setattr(memory, name, value)
+        return memory
+
+    def translate_integer(self, value):
+        """Make sure value is an integer, JSON doesn't distinguish 1 from 1.0"""
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ParseError(f"Expected an integer but found '{value}'")
+        return value
+
+    def translate_float(self, value):
+        """Make sure value is a finite number, and make it a float
+
+        The json module accepts NaN and Infinity, which aren't valid JSON.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ParseError(f"Expected a number but found '{value}'")
+        if not math.isfinite(value):
+            raise ParseError(f"Expected a finite number but found '{value}'")
+        return float(value)
+
+    def translate_string(self, value):
+        """Make sure value is a string"""
+        if not isinstance(value, str):
+            raise ParseError(f"Expected a string but found '{value}'")
+        return value
+
+
+# parser classes by the name used on the command line
+PARSERS = {
+    "chirp": CHIRPParser,
+    "jsonl": JSONLinesParser,
+}
@@ -23,7 +23,13 @@
 This module contains all render classes for output file formats
 """
 
+import dataclasses
+import itertools
+import math
+from json.encoder import encode_basestring
+
 from .helpers import (
+    format_mhz,
     standard_offset,
 )
 from .models import (
@@ -47,52 +53,103 @@ class ADMS16Renderer:
         * channel 1 must not be empty
     """
 
-    def __init__(self):
-        super().__init__()
-        self._memory = None
+    # the Memory fields this renderer uses, parsers can skip everything else
+    FIELDS = frozenset(
+        {
+            "number",
+            "frequency",
+            "mode",
+            "offset",
+            "tx_ctcss_freq",
+            "tx_dcs_code",
+            "name16",
+        }
+    )
+
+    # file extension for output files
+    EXTENSION = ".csv"
+
+    # number of memory slots in the radio, every one must be in the file
+    SLOTS = 999
+
+    # memories are put in the slot for their number, so they must arrive in
+    # order of memory number
+    BY_NUMBER = True
+
+    # number of slots in each chunk for parallel rendering
+    DEFAULT_CHUNK_SIZE = 100
 
     def render(self, memories, fileobj):
-        """Render a list of memories to the file object
+        """Render an iterable of memories to the file object
 
         fileobj needs to be opened with newline = '\n'
 
+        memories are consumed one at a time, so they can be a generator. The
+        renderer keeps no state between calls, so one instance can render many
+        files at once, including from multiple threads.
+        """
+        for line in self.render_slots(memories, 1, self.SLOTS):
+            fileobj.write(line)
+
+    def chunks(self, memories, size=DEFAULT_CHUNK_SIZE):
+        """Split memories into chunks of contiguous slots which can be rendered
+        independently by render_chunk()
+
+        Each chunk is a tuple of (first_slot, last_slot, list_of_memories).
+        Memories are assigned to chunks by walking the slots the same way
+        render_slots() does, so rendering the chunks in order produces exactly
+        the same output as render().
+        """
+        memories = iter(memories)
+        memory = next(memories, None)
+        for first in range(1, self.SLOTS + 1, size):
+            last = min(first + size - 1, self.SLOTS)
+            chunk = []
+            for line_number in range(first, last + 1):
+                if memory is not None and memory.number == line_number:
+                    chunk.append(memory)
+                    memory = next(memories, None)
+            yield (first, last, chunk)
+
+    def render_chunk(self, chunk):
+        """Render a chunk from chunks() into a string"""
+        first, last, memories = chunk
+        return "".join(self.render_slots(memories, first, last))
+
+    def render_slots(self, memories, first, last):
+        """Generate a line for each slot from first to last, inclusive
+
+        Each line ends with a newline.
         """
         # TODO memories must be sorted in increasing order of memory number
-        # and be unique memory numbers
-        #
-        # lineno is the line number in the file, which must have 999 lines when
-        # we are done
-        #
-        # memory_pos is the index in memories that we are currently iterating on
-        memory_pos = 0
-
-        # generate numbers 1 to 999, each of these lines must be present in the file
-        # or ADMS-16 will refuse to import it
-        for line_number in range(1, 1000):
+        # and be unique memory numbers, hrpt.sorting.external_sort() can sort
+        # them, but we don't check for duplicates
+        memories = iter(memories)
+        memory = next(memories, None)
+
+        # generate a line for every slot, each of these lines must be present in
+        # the file or ADMS-16 will refuse to import it
+        for line_number in range(first, last + 1):
             # special case to ensure we have a row in the file for channel 1
             # ADMS-16 won't import if there isn't a memory on channel 1
-            if line_number == 1 and (not memories or memories[0].number != 1):
+            if line_number == 1 and (memory is None or memory.number != 1):
                 call = Memory(number=1)
                 call.frequency = Frequency(146_520_000)
-                fileobj.write(f"{self.render_memory(call)}\n")
+                yield f"{self.render_memory(call)}\n"
                 continue
 
-            if memories[memory_pos].number == line_number:
-                fileobj.write(f"{self.render_memory(memories[memory_pos])}\n")
-                # increment memory_pos to point to the next spot in the array,
-                # unless we are already at the end
-                if memory_pos + 1 < len(memories):
-                    memory_pos += 1
+            if memory is not None and memory.number == line_number:
+                yield f"{self.render_memory(memory)}\n"
+                # move on to the next memory, if there is one
+                memory = next(memories, None)
             else:
                 empty = Memory(number=line_number)
-                fileobj.write(f"{self.render_memory(empty)}\n")
-                # no need to increment memory_pos because we didn't use
+                yield f"{self.render_memory(empty)}\n"
+                # no need to move to the next memory because we didn't use
                 # a memory, we just put a blank line
 
     def render_memory(self, memory):
         """generate a representing one memory, which will be one line in the file"""
-        # save memory in self._memory so we can use it for error reporting
-        self._memory = memory
         if memory.number and not memory.frequency:
             # this is an empty memory
             return f"{memory.number},,,,,,,,,,,,,,,,,,,,0"
@@ -104,7 +161,7 @@ class ADMS16Renderer:
 
         # column 2: rx frequency
         if not memory.frequency:
-            raise RenderError("Memory '{memory.number}' does not have a frequency.")
+            raise RenderError(f"Memory '{memory.number}' does not have a frequency.")
         out.append(self.render_frequency_as_mhz(memory.frequency))
 
         # columns 3, 4, 5: tx frequency, offset, offset direction
@@ -145,7 +202,7 @@ class ADMS16Renderer:
             out.append("")
 
         # columns 9, 10, 11: tone type, ctcss freq, dcs code
-        (tone_type, ctcss_freq, dcs_code) = self.render_tone()
+        (tone_type, ctcss_freq, dcs_code) = self.render_tone(memory)
         out.append(tone_type)
         out.append(ctcss_freq)
         out.append(dcs_code)
@@ -191,15 +248,13 @@ class ADMS16Renderer:
 
     def render_frequency_as_mhz(self, freq):
         """render an integer frequency in hz as mhz"""
-        mhz = freq / 1_000_000
-        return f"{mhz:.5f}"
+        return format_mhz(freq, places=5)
 
     def render_offset_as_mhz(self, offset):
         """render the offset frequency as a string in MHz
         gotta take the abs of the frequency to comply with the file format expectations
         """
-        mhz = abs(offset) / 1_000_000
-        return f"{mhz:.5f}"
+        return format_mhz(abs(offset), places=5)
 
     def render_offset_direction(self, offset_freq):
         """take an integer offset frequency and turn it into the proper string"""
@@ -210,25 +265,19 @@ class ADMS16Renderer:
         elif offset_freq > 0:
             return "+RPT"
         # shouldn't get here
-        raise RenderError(
-            f"Memory '{self._memory.number}' has an unknown"
-            f" offset_frequency of '{offset_freq}'"
-        )
-
-    def render_tone(self):
-        """render tone type, ctcss freq, and dtcs code
+        raise RenderError(f"Unknown offset_frequency of '{offset_freq}'")
 
-        use self._memory
-        """
+    def render_tone(self, memory):
+        """render tone type, ctcss freq, and dtcs code for memory"""
         # if we have a ctcss tone, that takes precendence
-        if self._memory.tx_ctcss_freq:
+        if memory.tx_ctcss_freq:
             tone_type = "TONE"
-            ctcss_freq = self.render_ctcss_freq(self._memory.tx_ctcss_freq)
+            ctcss_freq = self.render_ctcss_freq(memory.tx_ctcss_freq)
             dcs_code = self.render_dcs_code(None)
-        elif self._memory.tx_dcs_code:
+        elif memory.tx_dcs_code:
             tone_type = "DCS"
             ctcss_freq = self.render_ctcss_freq(None)
-            dcs_code = self.render_dcs_code(self._memory.tx_dcs_code)
+            dcs_code = self.render_dcs_code(memory.tx_dcs_code)
         else:
             tone_type = "OFF"
             ctcss_freq = self.render_ctcss_freq(None)
@@ -254,3 +303,96 @@ class ADMS16Renderer:
         """Render a frequency step as a string"""
         step = step / 1_000
         return f"{step:.1f}KHz"
+
+
+class JSONLinesRenderer:
+    """Render memories in JSON Lines format, which JSONLinesParser reads
+
+    Every field of every memory is written, so nothing is lost. Each line is
+    built directly from the memory with an f-string, instead of building a dict
+    and passing it to json.dumps().
+    """
+
+    # every field on Memory
+    FIELDS = frozenset(f.name for f in dataclasses.fields(Memory))
+
+    # file extension for output files
+    EXTENSION = ".jsonl"
+
+    # memories are written in the order they arrive, whatever their number
+    BY_NUMBER = False
+
+    # number of memories in each chunk for parallel rendering
+    DEFAULT_CHUNK_SIZE = 10_000
+
+    def render(self, memories, fileobj):
+        """Render an iterable of memories to the file object, one per line"""
+        for memory in memories:
+            fileobj.write(self.render_memory(memory))
+            fileobj.write("\n")
+
+    def chunks(self, memories, size=DEFAULT_CHUNK_SIZE):
+        """Split memories into lists which can be rendered by render_chunk()"""
+        memories = iter(memories)
+        while True:
+            chunk = list(itertools.islice(memories, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def render_chunk(self, chunk):
+        """Render a chunk from chunks() into a string"""
+        return "".join(f"{self.render_memory(memory)}\n" for memory in chunk)
+
+    def render_memory(self, memory):
+        """Render a memory as a JSON object on a single line"""
+        return (
+            f'{{"number":{_json_int(memory.number)}'
+            f',"frequency":{_json_int(memory.frequency)}'
+            f',"mode":{_json_enum(memory.mode)}'
+            f',"offset":{_json_int(memory.offset)}'
+            f',"tx_ctcss_freq":{_json_float(memory.tx_ctcss_freq)}'
+            f',"rx_ctcss_freq":{_json_float(memory.rx_ctcss_freq)}'
+            f',"tx_dcs_code":{_json_int(memory.tx_dcs_code)}'
+            f',"rx_dcs_code":{_json_int(memory.rx_dcs_code)}'
+            f',"name6":{_json_str(memory.name6)}'
+            f',"name8":{_json_str(memory.name8)}'
+            f',"name16":{_json_str(memory.name16)}'
+            f',"description":{_json_str(memory.description)}}}'
+        )
+
+
+def _json_int(value):
+    if value is None:
+        return "null"
+    # int() so Frequency and friends render as plain numbers
+    return int.__repr__(value)
+
+
+def _json_enum(value):
+    if value is None:
+        return "null"
+    return encode_basestring(value.value)
+
+
+def _json_float(value):
+    if value is None:
+        return "null"
+    value = float(value)
+    # repr() would give nan or inf, which aren't valid JSON
+    if not math.isfinite(value):
+        raise RenderError(f"Can't render '{value}' as a JSON number")
+    return repr(value)
+
+
+def _json_str(value):
+    if value is None:
+        return "null"
+    return encode_basestring(value)
+
+
+# renderer classes by the name used on the command line
+RENDERERS = {
+    "adms16": ADMS16Renderer,
+    "jsonl": JSONLinesRenderer,
+}
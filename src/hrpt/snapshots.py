@@ -0,0 +1,203 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module keeps every revision of a set of memories in a single file
+
+Each memory is canonicalized by rendering it as a line of JSON with
+JSONLinesRenderer, which includes every field. The line is hashed, and each
+unique line is stored only once, no matter how many revisions contain it. A
+revision is a list of the hashes of its memories, packed into a single blob,
+so thousands of revisions of a 999 memory list take very little space.
+
+Two revisions can be compared by their sets of hashes without loading any
+memories, only the memories which differ are loaded to see how they differ.
+"""
+
+import copy
+import dataclasses
+import datetime
+import hashlib
+import sqlite3
+
+from .diff import diff_memories
+from .models import ParseError
+from .parsers import JSONLinesParser
+from .renderers import JSONLinesRenderer
+
+# bytes in each record hash
+HASH_SIZE = 16
+
+# most hashes to look up in a single query, sqlite limits the number of
+# parameters in a query
+_BATCH_SIZE = 500
+
+
+@dataclasses.dataclass
+class Revision:
+    """Summary information about a revision in a SnapshotStore"""
+
+    id: int
+    message: str
+    created: str
+    count: int
+
+
+class SnapshotStore:
+    """A versioned store of sets of memories, deduplicated by memory
+
+    The store is a SQLite database. Can be used as a context manager, which
+    closes the store on exit.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._renderer = JSONLinesRenderer()
+        self._parser = JSONLinesParser()
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " hash BLOB PRIMARY KEY,"
+                " data TEXT NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS revisions ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " message TEXT NOT NULL,"
+                " created TEXT NOT NULL,"
+                " hashes BLOB NOT NULL"
+                ")"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the store"""
+        self._connection.close()
+
+    def canonicalize(self, memory):
+        """Return the canonical text and hash of a memory"""
+        data = self._renderer.render_memory(memory)
+        digest = hashlib.blake2b(data.encode("utf8"), digest_size=HASH_SIZE)
+        return data, digest.digest()
+
+    def commit(self, memories, message=""):
+        """Store a new revision containing memories, and return its id"""
+        hashes = []
+        records = {}
+        for memory in memories:
+            data, digest = self.canonicalize(memory)
+            hashes.append(digest)
+            records[digest] = data
+        created = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO records (hash, data) VALUES (?, ?)",
+                records.items(),
+            )
+            cursor = self._connection.execute(
+                "INSERT INTO revisions (message, created, hashes) VALUES (?, ?, ?)",
+                (message, created, b"".join(hashes)),
+            )
+        return cursor.lastrowid
+
+    def revisions(self):
+        """Return a list of Revision, oldest first"""
+        cursor = self._connection.execute(
+            "SELECT id, message, created, length(hashes) FROM revisions ORDER BY id"
+        )
+        return [
+            Revision(rev_id, message, created, size // HASH_SIZE)
+            for rev_id, message, created, size in cursor
+        ]
+
+    def latest(self):
+        """Return the id of the most recent revision, or None if there aren't any"""
+        row = self._connection.execute("SELECT max(id) FROM revisions").fetchone()
+        return row[0]
+
+    def hashes(self, revision):
+        """Return the list of record hashes in a revision, in order"""
+        row = self._connection.execute(
+            "SELECT hashes FROM revisions WHERE id = ?", (revision,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No revision '{revision}'")
+        blob = row[0]
+        return [blob[pos : pos + HASH_SIZE] for pos in range(0, len(blob), HASH_SIZE)]
+
+    def _load(self, hashes):
+        """Return a dict of hash to Memory for the unique hashes given"""
+        unique = list(set(hashes))
+        memories = {}
+        for start in range(0, len(unique), _BATCH_SIZE):
+            batch = unique[start : start + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self._connection.execute(
+                f"SELECT hash, data FROM records WHERE hash IN ({placeholders})",
+                batch,
+            )
+            for digest, data in cursor:
+                memories[digest] = self._parser.parse_line(data, JSONLinesParser.FIELDS)
+        if len(memories) != len(unique):
+            raise ParseError("Snapshot store is missing records")
+        return memories
+
+    def checkout(self, revision):
+        """Generate the memories in a revision, in the order they were committed
+
+        Every call creates new Memory objects, so they can be changed freely.
+        Raises KeyError right away if the revision doesn't exist.
+        """
+        return self._checkout(self.hashes(revision))
+
+    def _checkout(self, hashes):
+        for start in range(0, len(hashes), _BATCH_SIZE):
+            batch = hashes[start : start + _BATCH_SIZE]
+            memories = self._load(batch)
+            for digest in batch:
+                # the same record can be in a revision more than once
+                yield copy.copy(memories[digest])
+
+    def diff(self, old_revision, new_revision):
+        """Compare two revisions and return a hrpt.diff.MemoryDiff
+
+        Memories with the same hash in both revisions are identical, so only
+        the memories whose hashes are in one revision and not the other are
+        loaded and compared.
+        """
+        old_hashes = set(self.hashes(old_revision))
+        new_hashes = set(self.hashes(new_revision))
+        removed = old_hashes - new_hashes
+        added = new_hashes - old_hashes
+        memories = self._load(removed | added)
+        return diff_memories(
+            (memories[digest] for digest in removed),
+            (memories[digest] for digest in added),
+        )
@@ -0,0 +1,220 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+This module sorts streams of memories which may be too large to fit in memory
+
+Memories are collected into a buffer. When the buffer is full it is sorted and
+spilled to a temporary file as compact records, which is called a run. When the
+input is exhausted the runs are merged back together into a single sorted
+stream of Memory objects. Only one record from each run is in memory during
+the merge, so memory use is bounded by the buffer size, no matter how large the
+input is.
+"""
+
+import heapq
+import marshal
+import tempfile
+
+from .models import Band, Frequency, Memory, Mode
+
+# how many memories to hold in memory before spilling a sorted run to disk
+DEFAULT_BUFFER_SIZE = 100_000
+
+# most runs to merge at once, more than this and we merge in several passes
+# so we don't run out of file descriptors
+MAX_MERGE_RUNS = 64
+
+_BAND_ORDER = {band: index for index, band in enumerate(Band)}
+
+
+def _frequency_key(memory):
+    # memories without a frequency go at the end
+    return (memory.frequency is None, memory.frequency or 0)
+
+
+def _band_key(memory):
+    if memory.frequency is None:
+        return (len(_BAND_ORDER), 0)
+    return (_BAND_ORDER[memory.frequency.band], memory.frequency)
+
+
+SORT_KEYS = {
+    "number": lambda memory: memory.number,
+    "frequency": _frequency_key,
+    "band": _band_key,
+}
+
+
+def _to_record(memory):
+    """Convert a memory into a tuple of plain values that marshal can handle"""
+    return (
+        memory.number,
+        None if memory.frequency is None else int(memory.frequency),
+        None if memory.mode is None else memory.mode.value,
+        memory.offset,
+        memory.tx_ctcss_freq,
+        memory.rx_ctcss_freq,
+        memory.tx_dcs_code,
+        memory.rx_dcs_code,
+        memory.name6,
+        memory.name8,
+        memory.name16,
+        memory.description,
+    )
+
+
+def _from_record(record):
+    """Convert a tuple from _to_record() back into a memory"""
+    memory = Memory(record[0])
+    if record[1] is not None:
+        memory.frequency = Frequency(record[1])
+    if record[2] is not None:
+        memory.mode = Mode(record[2])
+    (
+        memory.offset,
+        memory.tx_ctcss_freq,
+        memory.rx_ctcss_freq,
+        memory.tx_dcs_code,
+        memory.rx_dcs_code,
+        memory.name6,
+        memory.name8,
+        memory.name16,
+        memory.description,
+    ) = record[3:]
+    return memory
+
+
+def _write_run(memories, tmpdir):
+    """Write memories to a new temporary file and return it, rewound"""
+    # the caller closes the file when the merge is done
+    run = tempfile.TemporaryFile(dir=tmpdir)  # noqa: SIM115
+    for memory in memories:
+        marshal.dump(_to_record(memory), run)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    """Generate memories from a temporary file created by _write_run()"""
+    while True:
+        try:
+            record = marshal.load(run)
+        except EOFError:
+            return
+        yield _from_record(record)
+
+
+def external_sort(memories, key="number", buffer_size=DEFAULT_BUFFER_SIZE, tmpdir=None):
+    """Sort an iterable of memories, spilling to disk if there are a lot of them
+
+    key is one of the names in SORT_KEYS, or a function which takes a Memory
+    and returns a sort key. The sort is stable.
+
+    buffer_size is the largest number of memories to hold in memory at once.
+    If the input has more than this, sorted runs are written to temporary
+    files in tmpdir, or the system default temporary directory if tmpdir is
+    None, and then merged.
+
+    This is a generator, it yields sorted memories one at a time.
+    """
+    if not callable(key):
+        key = SORT_KEYS[key]
+    if buffer_size < 1:
+        raise ValueError("buffer_size must be at least 1")
+
+    runs = []
+    try:
+        buffer = []
+        for memory in memories:
+            buffer.append(memory)
+            if len(buffer) >= buffer_size:
+                buffer.sort(key=key)
+                runs.append(_write_run(buffer, tmpdir))
+                buffer = []
+        buffer.sort(key=key)
+
+        if not runs:
+            # it all fit in memory, no need to merge anything
+            yield from buffer
+            return
+
+        if buffer:
+            runs.append(_write_run(buffer, tmpdir))
+            buffer = []
+
+        while len(runs) > MAX_MERGE_RUNS:
+            # merge the oldest runs first so equal keys keep their order
+            merging = runs[:MAX_MERGE_RUNS]
+            merged = heapq.merge(*(_read_run(run) for run in merging), key=key)
+            runs = [_write_run(merged, tmpdir), *runs[MAX_MERGE_RUNS:]]
+            for run in merging:
+                run.close()
+
+        yield from heapq.merge(*(_read_run(run) for run in runs), key=key)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def spool(memories, buffer_size=DEFAULT_BUFFER_SIZE, tmpdir=None):
+    """Read every memory, then generate them again in the same order
+
+    Used by stages which need to see the whole stream before they yield the
+    first memory. At most buffer_size memories are held in memory, the rest
+    are written to a temporary file in tmpdir, or the system default
+    temporary directory if tmpdir is None.
+    """
+    if buffer_size < 1:
+        raise ValueError("buffer_size must be at least 1")
+    spill = None
+    try:
+        buffer = []
+        for memory in memories:
+            buffer.append(memory)
+            if len(buffer) >= buffer_size:
+                if spill is None:
+                    # closed in the finally clause
+                    spill = tempfile.TemporaryFile(dir=tmpdir)  # noqa: SIM115
+                for buffered in buffer:
+                    marshal.dump(_to_record(buffered), spill)
+                buffer = []
+        if spill is not None:
+            spill.seek(0)
+            yield from _read_run(spill)
+        yield from buffer
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+def renumber(memories, start=1):
+    """Number memories consecutively, in the order they arrive, from start
+
+    Renderers like ADMS16Renderer put each memory in the slot for its number,
+    so after sorting by anything other than number the memories need new
+    numbers or most of them would be skipped.
+
+    This is a generator, memories are modified in place and yielded.
+    """
+    for number, memory in enumerate(memories, start):
+        memory.number = number
+        yield memory
@@ -84,6 +84,23 @@ def pytest_clean(context):
 
 namespace_clean.add_task(pytest_clean, "pytest")
 
+
+@invoke.task
+def benchmark(context):
+    "Compare fixed point MHz parsing against the float round trip"
+    context.run(
+        "python -m timeit -s 'from hrpt.helpers import parse_mhz'"
+        " \"parse_mhz('447.100000')\"",
+        echo=True,
+    )
+    context.run(
+        "python -m timeit \"int(float('447.100000') * 1_000_000)\"",
+        echo=True,
+    )
+
+
+namespace.add_task(benchmark)
+
 #####
 #
 # build and distribute
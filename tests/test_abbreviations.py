@@ -0,0 +1,127 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import pytest
+
+from hrpt.abbreviations import Abbreviator, ShortNamer
+from hrpt.models import Memory
+
+
+@pytest.mark.parametrize(
+    "name, length, short",
+    [
+        ("APRS", 6, "APRS"),
+        ("  Herriman ", 8, "Herriman"),
+        ("Iron Mountain", 8, "Iron MTN"),
+        ("DHRA Repeater", 8, "DHRA RPT"),
+        ("DHRA Repeater", 6, "DHRARP"),
+        ("Mt Dutton", 8, "MtDutton"),
+        ("Murdock Peak", 8, "MurdckPK"),
+        ("UARC/Scott&Farns", 8, "UARCSctt"),
+        ("I/Medicine Butte", 6, "IMdcnB"),
+        ("1.25m UT Simplex", 8, "1.25mUTS"),
+        ("1.25m UT Simplex", 6, "1.25mU"),
+        ("Ch. 5 Simplex", 8, "Ch 5 SPX"),
+        ("146.52 Calling", 12, "146.52 CALL"),
+    ],
+)
+def test_abbreviate(name, length, short):
+    assert Abbreviator().abbreviate(name, length) == short
+
+
+def test_abbreviate_custom_dictionary():
+    abbreviator = Abbreviator({"Farnsworth": "FW"})
+    assert abbreviator.abbreviate("I/Farnsworth Peak", 8) == "IFWPeak"
+
+
+def test_abbreviate_memoized():
+    abbreviator = Abbreviator()
+    first = abbreviator.abbreviate("Intermountain Ridge", 6)
+    assert abbreviator.abbreviate("Intermountain Ridge", 6) is first
+
+
+def _memory(number, name16, name6=None):
+    memory = Memory(number)
+    memory.name16 = name16
+    memory.name6 = name6
+    return memory
+
+
+def test_short_names_collisions():
+    names = ["Mount Ogden", "Mount Ogden", "Mount Ogden", "BYU", "BYU"]
+    memories = [_memory(number, name) for number, name in enumerate(names)]
+    memories = list(ShortNamer().assign(memories))
+    assert [m.name6 for m in memories] == ["MTOgdn", "MTOgd2", "MTOgd3", "BYU", "BYU2"]
+    assert [m.name8 for m in memories] == [
+        "MT Ogden",
+        "MT Ogde2",
+        "MT Ogde3",
+        "BYU",
+        "BYU2",
+    ]
+
+
+def test_short_names_keeps_existing():
+    memories = [_memory(1, "Simplex", name6="BYU"), _memory(2, "BYU"), _memory(3, "")]
+    memories = list(ShortNamer().assign(memories))
+    assert [m.name6 for m in memories] == ["BYU", "BYU2", None]
+    assert [m.name8 for m in memories] == ["Simplex", "BYU", None]
+
+
+def test_short_names_reserves_later_existing():
+    memories = [_memory(1, "BYU"), _memory(2, "BYU"), _memory(3, "X", name6="BYU2")]
+    memories = list(ShortNamer().assign(memories))
+    assert [m.name6 for m in memories] == ["BYU", "BYU3", "BYU2"]
+
+
+def test_short_names_duplicate_existing():
+    memories = [
+        _memory(1, "Simplex", name6="BYU"),
+        _memory(2, "Provo", name6="BYU"),
+        _memory(3, "BYU"),
+    ]
+    memories = list(ShortNamer().assign(memories))
+    assert [m.name6 for m in memories] == ["BYU", "BYU2", "BYU3"]
+
+
+def test_short_names_trailing_digit():
+    names = ["Channel 1", "Channel 1", "Channel 12", "Channel 12"]
+    memories = [_memory(number, name) for number, name in enumerate(names)]
+    memories = list(ShortNamer().assign(memories))
+    assert [m.name6 for m in memories] == ["CH 1", "CH 1-2", "CH 12", "CH 1-3"]
+    assert [m.name8 for m in memories] == ["CH 1", "CH 1-2", "CH 12", "CH 12-2"]
+
+
+def test_short_names_spooled(tmp_path):
+    # presets later in the stream are still reserved when most of the
+    # memories are spooled to disk
+    names = ["BYU", "BYU", "Channel 1", "Channel 1", "Mount Ogden"] * 4
+
+    def make():
+        memories = [_memory(number, name) for number, name in enumerate(names)]
+        memories[-1].name6 = "BYU2"
+        return memories
+
+    expected = list(ShortNamer().assign(make()))
+    spooled = list(ShortNamer().assign(iter(make()), buffer_size=3, tmpdir=tmp_path))
+    assert spooled == expected
+    assert expected[1].name6 == "BYU3"
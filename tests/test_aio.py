@@ -0,0 +1,247 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import asyncio
+import io
+import socket
+import time
+
+import pytest
+
+import hrpt
+from hrpt import aio
+
+
+class MemoryWriter:
+    """Just enough of asyncio.StreamWriter to collect the output"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.drains = 0
+
+    def write(self, data):
+        self.buffer.write(data)
+
+    async def drain(self):
+        self.drains += 1
+
+
+def _reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+@pytest.fixture
+def chirp_bytes(input_files_dir):
+    return (input_files_dir / "mem1000-CHIRP.csv").read_bytes()
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 200, 10_000])
+def test_parse(chirp_bytes, input_files_dir, batch_size):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        expected = parser.parse(f)
+
+    async def run():
+        reader = _reader(chirp_bytes)
+        return [m async for m in aio.parse(reader, parser, batch_size=batch_size)]
+
+    assert asyncio.run(run()) == expected
+
+
+def test_parse_error_line_number():
+    data = b"header\n" + b"1,Ok,146.520000,,,,,,,,,,FM\n" * 5 + b"7,Bad,xyz\n"
+
+    async def run():
+        reader = _reader(data)
+        parser = hrpt.parsers.CHIRPParser()
+        return [m async for m in aio.parse(reader, parser, batch_size=2)]
+
+    with pytest.raises(hrpt.ParseError, match="Line 7"):
+        asyncio.run(run())
+
+
+def test_parse_empty():
+    async def run():
+        parser = hrpt.parsers.CHIRPParser()
+        return [m async for m in aio.parse(_reader(b""), parser)]
+
+    assert asyncio.run(run()) == []
+
+
+@pytest.mark.parametrize("output_format", ["adms16", "jsonl"])
+def test_convert(chirp_bytes, input_files_dir, output_format):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.RENDERERS[output_format]()
+    expected = io.StringIO(newline="\n")
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        hrpt.batch.convert(parser, renderer, f, expected)
+
+    async def run():
+        writer = MemoryWriter()
+        reader = _reader(chirp_bytes)
+        await aio.convert(reader, writer, parser, renderer, chunk_size=50)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.buffer.getvalue().decode("utf8") == expected.getvalue()
+    assert writer.drains > 1
+
+
+@pytest.mark.parametrize("output_format", ["adms16", "jsonl"])
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 999, 5000])
+def test_render_async_iterable(chirp_bytes, output_format, chunk_size):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.RENDERERS[output_format]()
+    memories = parser.parse(io.StringIO(chirp_bytes.decode("utf8"), newline=""))
+    expected = io.StringIO(newline="\n")
+    renderer.render(memories, expected)
+
+    async def source():
+        for memory in memories:
+            yield memory
+
+    writer = MemoryWriter()
+    asyncio.run(aio.render(source(), writer, renderer, chunk_size))
+    assert writer.buffer.getvalue().decode("utf8") == expected.getvalue()
+
+
+def test_convert_streams(chirp_bytes):
+    # output must start while the reader is still waiting for more input
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    head, tail = chirp_bytes[:2000], chirp_bytes[2000:]
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(head)
+        writer = MemoryWriter()
+        task = asyncio.ensure_future(
+            aio.convert(reader, writer, parser, renderer, batch_size=5, chunk_size=5)
+        )
+        for _ in range(100):
+            await asyncio.sleep(0)
+        streamed = writer.buffer.getvalue()
+        assert not task.done()
+        reader.feed_data(tail)
+        reader.feed_eof()
+        await task
+        return streamed, writer.buffer.getvalue()
+
+    streamed, output = asyncio.run(run())
+    assert streamed
+    assert output.startswith(streamed)
+    assert len(streamed) < len(output)
+
+
+def test_render_sync_iterable(input_files_dir, output_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        memories = parser.parse(f)
+    renderer = hrpt.renderers.ADMS16Renderer()
+    writer = MemoryWriter()
+    asyncio.run(aio.render(memories, writer, renderer, chunk_size=10))
+    assert writer.drains == 100
+    reference = (output_files_dir / "mem1000-ADMS16.csv").read_bytes()
+    assert writer.buffer.getvalue() == reference
+
+
+def test_concurrent_conversions_over_sockets(chirp_bytes, output_files_dir):
+    # many conversions share one loop and one parser and renderer
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    reference = (output_files_dir / "mem1000-ADMS16.csv").read_bytes()
+
+    async def one_conversion():
+        # keep both halves of every connection, a StreamWriter closes the
+        # connection when it's garbage collected
+        in_a, in_b = socket.socketpair()
+        out_a, out_b = socket.socketpair()
+        _source_reader, source = await asyncio.open_connection(sock=in_a)
+        reader, _reader_writer = await asyncio.open_connection(sock=in_b)
+        _writer_reader, writer = await asyncio.open_connection(sock=out_a)
+        result, sink = await asyncio.open_connection(sock=out_b)
+
+        async def feed():
+            source.write(chirp_bytes)
+            await source.drain()
+            source.close()
+
+        async def convert():
+            await aio.convert(reader, writer, parser, renderer, batch_size=16)
+            writer.close()
+
+        _, _, output = await asyncio.gather(feed(), convert(), result.read())
+        sink.close()
+        return output
+
+    async def run():
+        return await asyncio.gather(*(one_conversion() for _ in range(10)))
+
+    assert asyncio.run(run()) == [reference] * 10
+
+
+def test_convert_jsonl_latency(chirp_bytes):
+    # rendering 10,000 memories must not block the loop for long at a stretch
+    header, *rows = chirp_bytes.decode("utf8").splitlines(True)
+    data = (header + "".join(rows * (10_000 // len(rows) + 1))).encode("utf8")
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.JSONLinesRenderer()
+
+    memories = parser.parse(io.StringIO(data.decode("utf8"), newline=""))
+    start = time.perf_counter()
+    renderer.render_chunk(memories)
+    all_at_once = time.perf_counter() - start
+
+    class Writer(MemoryWriter):
+        def __init__(self):
+            super().__init__()
+            self.writes = []
+
+        def write(self, data):
+            self.writes.append(data)
+            super().write(data)
+
+    async def ticker(gaps, done):
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def run():
+        writer = Writer()
+        gaps = []
+        done = asyncio.Event()
+        tick = asyncio.ensure_future(ticker(gaps, done))
+        await aio.convert(_reader(data), writer, parser, renderer)
+        done.set()
+        await tick
+        return writer, gaps
+
+    writer, gaps = asyncio.run(run())
+    assert len(writer.writes) > 1
+    assert max(data.count(b"\n") for data in writer.writes) <= aio.DEFAULT_BATCH_SIZE
+    assert max(gaps) < all_at_once / 4
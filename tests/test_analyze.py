@@ -0,0 +1,148 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import itertools
+import json
+import random
+
+import pytest
+
+from hrpt.__main__ import main
+from hrpt.analyze import analyze, find_adjacent, find_intermod
+from hrpt.models import Band, Frequency, Memory
+
+
+def _brute_force_intermod(frequencies, tolerance):
+    hits = set()
+    for f1, f2, f3, victim in itertools.product(frequencies, repeat=4):
+        if f1 > f2 or f3 in (f1, f2) or victim in (f1, f2, f3):
+            continue
+        product = f1 + f2 - f3
+        if abs(product - victim) <= tolerance:
+            hits.add((f1, f2, f3, product, victim))
+    return hits
+
+
+@pytest.mark.parametrize("tolerance", [0, 2_500, 10_000])
+def test_find_intermod_matches_brute_force(tolerance):
+    rand = random.Random(tolerance)
+    frequencies = sorted(
+        {Frequency(144_000_000 + 5_000 * rand.randrange(400)) for _ in range(25)}
+    )
+    hits = find_intermod(frequencies, tolerance)
+    assert len(set(hits)) == len(hits)
+    assert set(hits) == _brute_force_intermod(frequencies, tolerance)
+
+
+def test_find_intermod_simple():
+    frequencies = [Frequency(f) for f in (146_520_000, 146_940_000, 147_360_000)]
+    hits = find_intermod(frequencies, 0)
+    # equally spaced channels hit each other
+    assert {(f1, f2, f3, victim) for f1, f2, f3, _, victim in hits} == {
+        (146_940_000, 146_940_000, 146_520_000, 147_360_000),
+        (146_940_000, 146_940_000, 147_360_000, 146_520_000),
+    }
+
+
+def test_find_intermod_three_signals():
+    # 146.52 + 146.94 - 146.70 = 146.76, no two signal product lands anywhere
+    frequencies = [
+        Frequency(f) for f in (146_520_000, 146_700_000, 146_760_000, 146_940_000)
+    ]
+    hits = find_intermod(frequencies, 0)
+    assert (146_520_000, 146_940_000, 146_700_000, 146_760_000, 146_760_000) in hits
+    assert (146_520_000, 146_940_000, 146_760_000, 146_700_000, 146_700_000) in hits
+    assert all(f1 != f2 for f1, f2, *_ in hits)
+
+
+def test_find_intermod_limit():
+    # evenly spaced channels have a huge number of hits, stop early
+    frequencies = [Frequency(440_000_000 + 12_500 * n) for n in range(3000)]
+    hits = find_intermod(frequencies, limit=100)
+    assert len(hits) == 100
+    assert len(find_intermod(frequencies[:40])) > 100
+
+
+def test_find_adjacent():
+    frequencies = [
+        Frequency(f) for f in (146_520_000, 146_530_000, 146_540_000, 146_600_000)
+    ]
+    hits = find_adjacent(Band.AMATEUR_2M, frequencies, 15_000)
+    assert [(hit.f1, hit.f2, hit.spacing) for hit in hits] == [
+        (146_520_000, 146_530_000, 10_000),
+        (146_530_000, 146_540_000, 10_000),
+    ]
+
+
+def test_analyze_by_band():
+    memories = []
+    for number, frequency in enumerate(
+        [146_520_000, 146_940_000, 147_360_000, 446_000_000, 446_010_000, 146_520_000]
+    ):
+        memory = Memory(number)
+        memory.frequency = Frequency(frequency)
+        memories.append(memory)
+    results = analyze(memories, tolerance=0, spacing=15_000)
+    assert [result.band for result in results] == [Band.AMATEUR_2M, Band.AMATEUR_70CM]
+    two_meters, seventy_cm = results
+    assert two_meters.numbers[146_520_000] == [0, 5]
+    assert len(two_meters.intermod) == 2
+    assert not two_meters.intermod_truncated
+    assert not two_meters.adjacent
+    assert not seventy_cm.intermod
+    assert len(seventy_cm.adjacent) == 1
+
+
+def test_analyze_command(input_files_dir, capsys):
+    input_file = str(input_files_dir / "mem1000-CHIRP.csv")
+    assert main(["analyze", "--json", "--tolerance", "0", input_file]) == 0
+    out, _ = capsys.readouterr()
+    data = json.loads(out)
+    assert "2m" in data
+    assert data["2m"]["intermod"]
+
+
+def test_analyze_limit():
+    memories = []
+    for number in range(50):
+        memory = Memory(number)
+        memory.frequency = Frequency(446_000_000 + 12_500 * number)
+        memories.append(memory)
+    (result,) = analyze(memories, limit=10)
+    assert len(result.intermod) == 10
+    assert result.intermod_truncated
+
+
+def test_analyze_command_text(input_files_dir, capsys):
+    input_file = str(input_files_dir / "mem1000-CHIRP.csv")
+    assert main(["analyze", "--limit", "5", input_file]) == 0
+    out, _ = capsys.readouterr()
+    assert "intermod: stopped after 5 hits" in out
+    assert " + " in out
+
+
+@pytest.mark.parametrize("option", ["-t", "-s"])
+def test_analyze_no_short_options(input_files_dir, option):
+    # -t and -s mean --to and --set before the command, so don't reuse them
+    input_file = str(input_files_dir / "mem1000-CHIRP.csv")
+    with pytest.raises(SystemExit):
+        main(["analyze", option, "0", input_file])
@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import io
+import threading
+
+import pytest
+
+import hrpt
+from hrpt.batch import convert, convert_file, convert_files, render_parallel
+from hrpt.models import Frequency, Memory
+
+
+@pytest.fixture
+def datasets(input_files_dir, tmp_path):
+    """write a bunch of different input files, each a subset of mem1000"""
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8") as f:
+        header, *rows = f.readlines()
+    paths = []
+    for index in range(24):
+        path = tmp_path / f"input{index}.csv"
+        path.write_text(header + "".join(rows[index % 5 :: index % 3 + 1]))
+        paths.append(path)
+    return paths
+
+
+def test_convert(input_files_dir, output_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    outfile = io.StringIO(newline="\n")
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        convert(parser, renderer, f, outfile)
+    reference_file = output_files_dir / "mem1000-ADMS16.csv"
+    assert outfile.getvalue() == reference_file.read_text()
+
+
+def test_convert_files_matches_serial(datasets, tmp_path):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+
+    serial = []
+    for index, input_path in enumerate(datasets):
+        output_path = tmp_path / f"serial{index}.csv"
+        convert_file(parser, renderer, input_path, output_path)
+        serial.append(output_path.read_bytes())
+
+    # run it a few times to give the threads a chance to interleave
+    for attempt in range(3):
+        jobs = [
+            (input_path, tmp_path / f"threaded{attempt}-{index}.csv")
+            for index, input_path in enumerate(datasets)
+        ]
+        outputs = convert_files(parser, renderer, jobs, max_workers=8)
+        assert [path for _, path in jobs] == outputs
+        assert [path.read_bytes() for path in outputs] == serial
+
+
+def test_shared_renderer_interleaved(input_files_dir):
+    # render two different lists with one renderer, switching between them
+    # one memory at a time, which would mix up any state kept on the renderer
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        memories = parser.parse(f)
+    expected = [renderer.render_memory(memory) for memory in memories]
+    reverse = [renderer.render_memory(memory) for memory in reversed(memories)]
+
+    results = {}
+
+    def render(name, memories):
+        results[name] = [renderer.render_memory(memory) for memory in memories]
+
+    threads = [
+        threading.Thread(target=render, args=(index, memories[:: 1 - 2 * (index % 2)]))
+        for index in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for index in range(8):
+        assert results[index] == (reverse if index % 2 else expected)
+
+
+def test_convert_files_error(datasets, tmp_path):
+    bad_input = tmp_path / "bad.csv"
+    bad_input.write_text("header\n1,Bad,not a frequency\n")
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    jobs = [(datasets[0], tmp_path / "good.csv"), (bad_input, tmp_path / "bad.out")]
+    with pytest.raises(hrpt.ParseError, match="Line 2"):
+        convert_files(parser, renderer, jobs)
+    assert (tmp_path / "good.csv").exists()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 998, 999, 5000])
+def test_render_parallel_matches_serial(datasets, chunk_size):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    # dataset 0 starts with memory 99, so it exercises the slot 1 rule
+    for input_path in datasets[:3]:
+        with open(input_path, encoding="utf8", newline="") as f:
+            memories = parser.parse(f)
+        serial = io.StringIO(newline="\n")
+        renderer.render(memories, serial)
+        parallel = io.StringIO(newline="\n")
+        render_parallel(renderer, iter(memories), parallel, chunk_size, max_workers=2)
+        assert parallel.getvalue() == serial.getvalue()
+
+
+def test_render_chunks_slot_one():
+    renderer = hrpt.renderers.ADMS16Renderer()
+    memory = Memory(1)
+    memory.frequency = Frequency(147_120_000)
+    for memories in ([], [memory]):
+        serial = io.StringIO(newline="\n")
+        renderer.render(memories, serial)
+        chunks = list(renderer.chunks(memories, 10))
+        assert len(chunks) == 100
+        assert "".join(renderer.render_chunk(c) for c in chunks) == serial.getvalue()
+
+
+def test_render_parallel_bounded(datasets):
+    # chunks must be pulled from the input as the output is written, not all
+    # submitted up front
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    with open(datasets[1], encoding="utf8", newline="") as f:
+        memories = parser.parse(f)
+
+    pulled = 0
+
+    def source():
+        nonlocal pulled
+        for memory in memories:
+            pulled += 1
+            yield memory
+
+    class Output(io.StringIO):
+        pulled_at_first_write = None
+
+        def write(self, text):
+            if self.pulled_at_first_write is None:
+                self.pulled_at_first_write = pulled
+            return super().write(text)
+
+    serial = io.StringIO(newline="\n")
+    renderer.render(memories, serial)
+    parallel = Output(newline="\n")
+    render_parallel(renderer, source(), parallel, chunk_size=1, max_workers=2)
+    assert parallel.getvalue() == serial.getvalue()
+    # a window of 4 chunks of one memory each
+    assert parallel.pulled_at_first_write == 4
+    assert len(memories) > 4
@@ -0,0 +1,135 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import json
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.diff import diff_as_json, diff_as_text, diff_memories
+from hrpt.models import DiffError, Frequency, Memory, Mode
+
+
+def _memory(number, frequency, name=None, offset=0):
+    memory = Memory(number)
+    memory.frequency = Frequency(frequency)
+    memory.offset = offset
+    memory.name16 = name
+    return memory
+
+
+def _mem1000(input_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        return parser.parse(f)
+
+
+def test_diff_identical(input_files_dir):
+    result = diff_memories(_mem1000(input_files_dir), _mem1000(input_files_dir))
+    assert not result
+    assert list(diff_as_text(result)) == []
+
+
+def test_diff_added_removed():
+    old = [_memory(1, 146_520_000, "Call"), _memory(2, 146_550_000)]
+    new = [_memory(1, 146_520_000, "Call"), _memory(3, 147_120_000)]
+    result = diff_memories(old, new)
+    assert [m.number for m in result.removed] == [2]
+    assert [m.number for m in result.added] == [3]
+    assert not result.moved
+    assert not result.modified
+
+
+def test_diff_moved():
+    old = [_memory(1, 146_520_000, "Call"), _memory(2, 147_120_000, "Rpt")]
+    new = [_memory(1, 146_520_000, "Call"), _memory(10, 147_120_000, "Repeater")]
+    result = diff_memories(old, new)
+    assert not result.added
+    assert not result.removed
+    (change,) = result.moved
+    assert (change.old.number, change.new.number) == (2, 10)
+    assert [fc.field for fc in change.changes] == ["number", "name16"]
+
+
+def test_diff_prefers_move_over_modify():
+    # the channel in 2 moved to 1, and the channel in 1 was deleted
+    old = [_memory(1, 146_520_000, "Call"), _memory(2, 147_120_000, "Rpt")]
+    new = [_memory(1, 147_120_000, "Rpt")]
+    result = diff_memories(old, new)
+    assert [(c.old.number, c.new.number) for c in result.moved] == [(2, 1)]
+    assert [m.number for m in result.removed] == [1]
+    assert not result.added
+    assert not result.modified
+
+
+def test_diff_modified():
+    old = [_memory(1, 146_520_000, "Call"), _memory(2, 147_120_000, "Rpt")]
+    new = [_memory(1, 146_520_000, "Calling"), _memory(2, 147_180_000, "Rpt")]
+    new[0].mode = Mode.NARROW_FM
+    result = diff_memories(old, new)
+    assert [c.new.number for c in result.modified] == [1, 2]
+    assert [fc.field for fc in result.modified[0].changes] == ["mode", "name16"]
+    (fc,) = result.modified[1].changes
+    assert (fc.field, fc.old, fc.new) == ("frequency", 147_120_000, 147_180_000)
+    assert "    frequency: '147.120000' -> '147.180000'" in diff_as_text(result)
+
+
+def test_diff_json():
+    old = [_memory(1, 146_520_000, "Call")]
+    new = [_memory(1, 146_520_000, "Call"), _memory(2, 147_120_000, offset=600_000)]
+    data = json.loads(json.dumps(diff_as_json(diff_memories(old, new))))
+    assert data["added"][0]["frequency"] == 147_120_000
+    assert data["added"][0]["mode"] == "FM"
+    assert data["added"][0]["offset"] == 600_000
+
+
+def test_diff_command(input_files_dir, capsys):
+    input_file = str(input_files_dir / "mem1000-CHIRP.csv")
+    assert main(["diff", "--json", input_file, input_file]) == 0
+    out, _ = capsys.readouterr()
+    assert json.loads(out) == {"added": [], "removed": [], "moved": [], "modified": []}
+
+
+def test_diff_duplicate_numbers():
+    old = [_memory(1, 146_520_000), _memory(2, 146_550_000)]
+    new = [
+        _memory(1, 146_520_000),
+        _memory(2, 146_550_000),
+        _memory(2, 147_120_000),
+        _memory(5, 147_340_000),
+        _memory(5, 147_340_000),
+    ]
+    with pytest.raises(DiffError, match="in new memories: 2, 5"):
+        diff_memories(old, new)
+    with pytest.raises(DiffError, match="in old memories: 2, 5"):
+        diff_memories(new, old)
+
+
+def test_diff_command_duplicate_numbers(input_files_dir, tmp_path, capsys):
+    input_file = input_files_dir / "mem1000-CHIRP.csv"
+    header, first, *rows = input_file.read_text(encoding="utf8").splitlines(True)
+    duplicated = tmp_path / "duplicated.csv"
+    duplicated.write_text(header + first + first + "".join(rows), encoding="utf8")
+    assert main(["diff", str(input_file), str(duplicated)]) == 1
+    _, err = capsys.readouterr()
+    assert "Duplicate memory numbers in new memories: 99" in err
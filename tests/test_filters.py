@@ -0,0 +1,168 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.filters import apply, compile_set, compile_where
+from hrpt.models import ExpressionError, Frequency, Memory, Mode
+
+
+@pytest.fixture
+def memory():
+    memory = Memory(5)
+    memory.frequency = Frequency(147_120_000)
+    memory.offset = 600_000
+    memory.tx_ctcss_freq = 100.0
+    memory.name16 = "Farnsworth"
+    return memory
+
+
+@pytest.mark.parametrize(
+    "expression, result",
+    [
+        ("band in (2m, 70cm)", True),
+        ("band not in (2m, 70cm)", False),
+        ("band == 2m and tx_ctcss_freq", True),
+        ("tx_dcs_code", False),
+        ("not tx_dcs_code", True),
+        ("mode == NFM", False),
+        ("mode == FM or mode == NFM", True),
+        ("len(name16) < 8", False),
+        ("len(name6) < 8", True),
+        ("frequency >= 147MHz and frequency < 147.5MHz", True),
+        ("frequency == 147120kHz", True),
+        ("offset == 600000", True),
+        ("name16 == 'Farnsworth'", True),
+        ("not (band == 2m and number > 10)", True),
+        ("tx_ctcss_freq > 88.5", True),
+        ("rx_ctcss_freq > 88.5", False),
+        # name fields compare with the text as written
+        ("name16 > 5", True),
+        ("name16 == 007", False),
+        ("name16 in (Farnsworth, 007)", True),
+        ("offset != 0", True),
+    ],
+)
+def test_where(memory, expression, result):
+    assert compile_where(expression)(memory) is result
+
+
+def test_where_fields():
+    where = compile_where("band == 2m and len(name16) < 8 or mode == FM")
+    assert where.fields == {"frequency", "name16", "mode"}
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "",
+        "band in",
+        "band in 2m",
+        "frequency >",
+        "(mode == FM",
+        "mode == FM )",
+        "2m == 2m",
+        "foo",
+        "len(2m) > 1",
+        "mode = FM",
+        "frequency > 1.5.5MHz",
+        "frequency == 1.5Hz",
+        "offset > 0.0001kHz",
+        "frequency == 146.5200001MHz",
+        "frequency > 146.6",
+        "146.6 < frequency",
+        "offset in (0.6, 5MHz)",
+        "frequency == 2m",
+    ],
+)
+def test_where_invalid(expression):
+    with pytest.raises(ExpressionError):
+        compile_where(expression)
+
+
+def test_set(memory):
+    compile_set("mode=NFM")(memory)
+    compile_set("frequency=146.52MHz")(memory)
+    compile_set("name16 = 'Simplex Call'")(memory)
+    compile_set("tx_ctcss_freq=")(memory)
+    assert memory.mode == Mode.NARROW_FM
+    assert memory.frequency == 146_520_000
+    assert isinstance(memory.frequency, Frequency)
+    assert memory.name16 == "Simplex Call"
+    assert memory.tx_ctcss_freq is None
+
+
+@pytest.mark.parametrize(
+    "expression", ["mode", "band=2m", "mode=AM", "frequency=146.52", "offset=(5)"]
+)
+def test_set_invalid(expression):
+    with pytest.raises(ExpressionError):
+        compile_set(expression)
+
+
+def test_apply(input_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        memories = list(
+            apply(
+                parser.iterparse(f),
+                compile_where("band == 70cm"),
+                [compile_set("mode=NFM")],
+            )
+        )
+    assert memories
+    assert all(m.frequency.band.value == "70cm" for m in memories)
+    assert all(m.mode == Mode.NARROW_FM for m in memories)
+
+
+def test_convert_where(input_files_dir, tmp_path):
+    output_file = tmp_path / "out.csv"
+    argv = ["-i", str(input_files_dir / "mem1000-CHIRP.csv"), "-o", str(output_file)]
+    assert main([*argv, "--where", "number == 101", "--set", "name16=DHRA"]) == 0
+    lines = output_file.read_text().splitlines()
+    assert len(lines) == 999
+    assert lines[100].startswith("101,447.10000,442.10000,5.00000,-RPT,FM,FM,DHRA,")
+    assert lines[101] == "102,,,,,,,,,,,,,,,,,,,,0"
+
+
+def test_where_string_literals():
+    memory = Memory(1)
+    memory.name16 = "007"
+    memory.name6 = "1.50"
+    assert compile_where("name16 == 007")(memory)
+    assert compile_where("007 == name16")(memory)
+    assert compile_where("name6 == 1.50")(memory)
+    assert not compile_where("number == 007 and name16 != 007")(memory)
+
+
+def test_set_string_literals():
+    memory = Memory(1)
+    compile_set("name16=007")(memory)
+    compile_set("name8=1.50")(memory)
+    compile_set("description=146.52MHz")(memory)
+    compile_set("number=007")(memory)
+    assert memory.name16 == "007"
+    assert memory.name8 == "1.50"
+    assert memory.description == "146.52MHz"
+    assert memory.number == 7
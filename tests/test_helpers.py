@@ -0,0 +1,78 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import pytest
+
+from hrpt.helpers import format_mhz, parse_mhz
+from hrpt.models import Band, ParseError
+
+
+@pytest.mark.parametrize(
+    "value, hz",
+    [
+        ("447.100000", 447_100_000),
+        ("146.520000", 146_520_000),
+        ("146.52", 146_520_000),
+        ("0.600000", 600_000),
+        ("5", 5_000_000),
+        (".5", 500_000),
+        ("5.", 5_000_000),
+        ("462.5625000", 462_562_500),
+        # float(value) * 1_000_000 truncates this one to 251110
+        ("0.251111", 251_111),
+    ],
+)
+def test_parse_mhz(value, hz):
+    assert parse_mhz(value) == hz
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", ".", "abc", "14a.52", "146.52.1", "-146.52", " 146.52", "1e3", "146.5200001"],
+)
+def test_parse_mhz_invalid(value):
+    with pytest.raises(ParseError):
+        parse_mhz(value)
+
+
+@pytest.mark.parametrize(
+    "hz, places, value",
+    [
+        (146_520_000, 6, "146.520000"),
+        (146_520_000, 5, "146.52000"),
+        (462_562_500, 5, "462.56250"),
+        (462_562_505, 5, "462.56251"),
+        (-600_000, 5, "-0.60000"),
+        (0, 5, "0.00000"),
+        (146_520_000, 0, "147"),
+    ],
+)
+def test_format_mhz(hz, places, value):
+    assert format_mhz(hz, places) == value
+
+
+@pytest.mark.parametrize("step", [5_000, 6_250, 12_500])
+def test_mhz_round_trip(step):
+    # every channel on every step in every band we know about
+    for band in Band:
+        for hz in range(band.start_freq, band.end_freq + 1, step):
+            assert parse_mhz(format_mhz(hz)) == hz
@@ -0,0 +1,139 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.batch import convert_files
+from hrpt.journal import Journal
+
+
+@pytest.fixture
+def inputs(input_files_dir, tmp_path):
+    text = (input_files_dir / "mem1000-CHIRP.csv").read_text(encoding="utf8")
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"radio{index}.csv"
+        path.write_text(text, encoding="utf8")
+        paths.append(path)
+    return paths
+
+
+def test_journal(tmp_path):
+    input_file = tmp_path / "input.csv"
+    input_file.write_text("some memories")
+    output_file = tmp_path / "output.csv"
+    input_hash = Journal.input_hash(input_file, "setting")
+    assert input_hash != Journal.input_hash(input_file, "other setting")
+
+    with Journal(tmp_path / "journal.sqlite") as journal:
+        assert not journal.is_done(output_file, input_hash)
+        journal.record(output_file, input_hash)
+        # the output file doesn't exist yet
+        assert not journal.is_done(output_file, input_hash)
+        output_file.write_text("rendered")
+        assert journal.is_done(output_file, input_hash)
+
+    # the journal persists
+    with Journal(tmp_path / "journal.sqlite") as journal:
+        assert journal.is_done(output_file, input_hash)
+        assert not journal.is_done(output_file, "different input")
+        journal.clear()
+        assert not journal.is_done(output_file, input_hash)
+
+
+def test_convert_files_resume(inputs, tmp_path, mocker):
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    jobs = [(path, tmp_path / f"{path.stem}.out") for path in inputs]
+
+    # make the third input bad, the others should still be recorded
+    good_text = inputs[2].read_text(encoding="utf8")
+    inputs[2].write_text("header\n1,Bad,not a frequency\n", encoding="utf8")
+    with Journal(tmp_path / "journal.sqlite") as journal, pytest.raises(
+        hrpt.ParseError
+    ):
+        convert_files(parser, renderer, jobs, max_workers=2, journal=journal)
+    assert not jobs[2][1].exists()
+
+    # fix the bad input, and touch up another one, only those two are redone
+    inputs[2].write_text(good_text, encoding="utf8")
+    inputs[4].write_text(good_text.replace("DHRA Repeater", "DHRA"), encoding="utf8")
+    spy = mocker.spy(hrpt.batch, "convert_file")
+    with Journal(tmp_path / "journal.sqlite") as journal:
+        outputs = convert_files(parser, renderer, jobs, max_workers=2, journal=journal)
+    assert outputs == [output for _, output in jobs]
+    assert sorted(call.args[2] for call in spy.call_args_list) == [inputs[2], inputs[4]]
+    assert "DHRA," in jobs[4][1].read_text()
+
+
+def test_batch_command(inputs, output_files_dir, tmp_path, mocker):
+    output_dir = tmp_path / "out"
+    argv = ["batch", "-d", str(output_dir), *(str(path) for path in inputs)]
+    assert main(argv) == 0
+    reference = (output_files_dir / "mem1000-ADMS16.csv").read_text()
+    for path in inputs:
+        assert (output_dir / f"{path.stem}.csv").read_text() == reference
+    assert (output_dir / ".hrpt-journal.sqlite").exists()
+
+    spy = mocker.spy(hrpt.batch, "convert_file")
+    assert main([*argv, "--resume"]) == 0
+    assert spy.call_count == 0
+    # without --resume everything is done again
+    assert main(argv) == 0
+    assert spy.call_count == len(inputs)
+
+    # jsonl output
+    assert main(["--to", "jsonl", *argv]) == 0
+    assert (output_dir / "radio0.jsonl").exists()
+
+
+def test_batch_duplicate_names(inputs, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    duplicate = other / inputs[0].name
+    duplicate.write_text(inputs[0].read_text())
+    argv = ["batch", "-d", str(tmp_path / "out"), str(inputs[0]), str(duplicate)]
+    assert main(argv) == 1
+
+
+def test_convert_files_interrupted(inputs, tmp_path, mocker):
+    # an interruption while waiting for results cancels the queued jobs
+    parser = hrpt.parsers.CHIRPParser()
+    renderer = hrpt.renderers.ADMS16Renderer()
+    jobs = [
+        (path, tmp_path / f"{path.stem}-{n}.out") for n in range(4) for path in inputs
+    ]
+    spy = mocker.spy(hrpt.batch, "convert_file")
+    with Journal(tmp_path / "journal.sqlite") as journal:
+        mocker.patch.object(journal, "record", side_effect=KeyboardInterrupt)
+        with pytest.raises(KeyboardInterrupt):
+            convert_files(parser, renderer, jobs, max_workers=1, journal=journal)
+    assert spy.call_count < len(jobs)
+
+
+def test_batch_no_short_workers(inputs, tmp_path):
+    # -w means --where before the command, so don't reuse it for --workers
+    argv = ["batch", "-d", str(tmp_path / "out"), "-w", "2", str(inputs[0])]
+    with pytest.raises(SystemExit):
+        main(argv)
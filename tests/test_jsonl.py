@@ -0,0 +1,157 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import io
+import json
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.abbreviations import ShortNamer
+from hrpt.models import Frequency, Memory, Mode, ParseError, RenderError
+
+
+@pytest.fixture
+def memories(input_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        memories = list(ShortNamer().assign(parser.iterparse(f)))
+    memories[0].description = 'Quotes " and \\ backslash and ünïcode'
+    memories[0].rx_dcs_code = 754
+    memories[1].mode = Mode.NARROW_FM
+    return memories
+
+
+def test_round_trip(memories):
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    outfile = io.StringIO()
+    renderer.render(memories, outfile)
+    outfile.seek(0)
+    parsed = hrpt.parsers.JSONLinesParser().parse(outfile)
+    assert parsed == memories
+    assert isinstance(parsed[0].frequency, Frequency)
+    assert parsed[1].mode == Mode.NARROW_FM
+
+
+def test_render_memory_is_json(memories):
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    data = json.loads(renderer.render_memory(memories[0]))
+    assert data["number"] == 99
+    assert data["frequency"] == 144_390_000
+    assert data["mode"] == "FM"
+    assert data["description"] == memories[0].description
+    assert list(data) == [
+        "number",
+        "frequency",
+        "mode",
+        "offset",
+        "tx_ctcss_freq",
+        "rx_ctcss_freq",
+        "tx_dcs_code",
+        "rx_dcs_code",
+        "name6",
+        "name8",
+        "name16",
+        "description",
+    ]
+
+
+def test_render_chunks(memories):
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    serial = io.StringIO()
+    renderer.render(memories, serial)
+    chunks = list(renderer.chunks(memories, 100))
+    assert len(chunks) == 4
+    assert "".join(renderer.render_chunk(c) for c in chunks) == serial.getvalue()
+
+
+def test_parse_fields():
+    line = '{"number": 5, "frequency": 146520000, "name16": "Call", "extra": 1}\n'
+    parser = hrpt.parsers.JSONLinesParser()
+    (memory,) = parser.parse(["\n", line], fields={"frequency"})
+    assert memory.number == 5
+    assert memory.frequency == 146_520_000
+    assert memory.name16 is None
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "not json",
+        "[1, 2]",
+        '{"frequency": 146520000}',
+        '{"number": 1, "frequency": 146.52}',
+        '{"number": 1, "mode": "AM"}',
+        '{"number": true}',
+        '{"number": 1, "tx_ctcss_freq": "88.5"}',
+        '{"number": 1, "rx_ctcss_freq": NaN}',
+        '{"number": 1, "tx_ctcss_freq": Infinity}',
+        '{"number": 1, "name16": 42}',
+        '{"number": 1, "description": ["a"]}',
+    ],
+)
+def test_parse_invalid(line):
+    parser = hrpt.parsers.JSONLinesParser()
+    with pytest.raises(ParseError, match="Line 2"):
+        parser.parse(['{"number": 1}\n', line])
+
+
+def test_pipeline(input_files_dir, output_files_dir, tmp_path):
+    # CHIRP -> jsonl -> ADMS-16 is the same as CHIRP -> ADMS-16
+    jsonl_file = tmp_path / "mem1000.jsonl"
+    output_file = tmp_path / "mem1000.csv"
+    input_file = input_files_dir / "mem1000-CHIRP.csv"
+    assert main(["-i", str(input_file), "-o", str(jsonl_file), "--to", "jsonl"]) == 0
+    assert main(["-i", str(jsonl_file), "-o", str(output_file), "--from", "jsonl"]) == 0
+    reference_file = output_files_dir / "mem1000-ADMS16.csv"
+    assert output_file.read_text() == reference_file.read_text()
+
+
+def test_memory_defaults_round_trip():
+    memory = Memory(7)
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    line = renderer.render_memory(memory)
+    assert hrpt.parsers.JSONLinesParser().parse([line]) == [memory]
+
+
+def test_parse_integer_tone():
+    parser = hrpt.parsers.JSONLinesParser()
+    (memory,) = parser.parse(['{"number": 1, "tx_ctcss_freq": 100}'])
+    assert memory.tx_ctcss_freq == 100.0
+    assert isinstance(memory.tx_ctcss_freq, float)
+
+
+@pytest.mark.parametrize("tone", [float("nan"), float("inf"), float("-inf")])
+def test_render_non_finite(tone):
+    memory = Memory(1)
+    memory.rx_ctcss_freq = tone
+    with pytest.raises(RenderError):
+        hrpt.renderers.JSONLinesRenderer().render_memory(memory)
+
+
+@pytest.mark.parametrize("tone", ["nan", "inf"])
+def test_chirp_non_finite_tone(tone):
+    parser = hrpt.parsers.CHIRPParser()
+    lines = ["header", f"1,Bad,146.520000,,0.600000,Tone,{tone},88.5,023,NN,023,,FM"]
+    with pytest.raises(ParseError, match="Line 2"):
+        parser.parse(lines)
@@ -0,0 +1,91 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.models import Mode, ParseError
+
+
+def _parse(input_files_dir, fields=None):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        return parser.parse(f, fields)
+
+
+def test_parse_all_fields(input_files_dir):
+    memories = _parse(input_files_dir)
+    memory = memories[1]
+    assert memory.number == 101
+    assert memory.frequency == 447_100_000
+    assert memory.offset == -5_000_000
+    assert memory.tx_ctcss_freq == 100.0
+    assert memory.mode == Mode.FM
+    assert memory.name16 == "DHRA Repeater"
+
+
+def test_parse_only_frequency(input_files_dir):
+    memories = _parse(input_files_dir, fields={"frequency"})
+    memory = memories[1]
+    assert memory.number == 101
+    assert memory.frequency == 447_100_000
+    assert memory.offset is None
+    assert memory.tx_ctcss_freq is None
+    assert memory.name16 is None
+
+
+def test_parse_renderer_fields(input_files_dir):
+    renderer = hrpt.renderers.ADMS16Renderer()
+    assert _parse(input_files_dir, renderer.FIELDS) == _parse(input_files_dir)
+
+
+def test_parse_error_line_number():
+    parser = hrpt.parsers.CHIRPParser()
+    lines = [
+        "Location,Name,Frequency,Duplex,Offset,Tone,rToneFreq,cToneFreq,DtcsCode,"
+        "DtcsPolarity,RxDtcsCode,CrossMode,Mode",
+        "1,Good,146.520000,,0.600000,,88.5,88.5,023,NN,023,Tone->Tone,FM",
+        "2,Bad,146.550000,,0.600000,,88.5,88.5,023,NN,023,Tone->Tone,AM",
+    ]
+    with pytest.raises(ParseError, match="Line 3: Unknown Mode 'AM'"):
+        parser.parse(lines)
+    # the same parser works again, starting from line 1
+    with pytest.raises(ParseError, match="Line 3: Unknown Mode 'AM'"):
+        parser.parse(lines)
+    assert len(parser.parse(lines[:2])) == 1
+
+
+def test_parse_empty(tmp_path):
+    parser = hrpt.parsers.CHIRPParser()
+    assert parser.parse([]) == []
+    # an empty file renders the same as a file with only a header
+    empty_file = tmp_path / "empty.csv"
+    empty_file.write_text("")
+    header_file = tmp_path / "header.csv"
+    header_file.write_text("Location,Name,Frequency\n")
+    for input_file in (empty_file, header_file):
+        output_file = input_file.with_suffix(".out")
+        assert main(["-i", str(input_file), "-o", str(output_file)]) == 0
+    assert empty_file.with_suffix(".out").read_text() == (
+        header_file.with_suffix(".out").read_text()
+    )
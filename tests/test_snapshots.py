@@ -0,0 +1,109 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import copy
+import os
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.models import Frequency
+from hrpt.snapshots import SnapshotStore
+
+
+@pytest.fixture
+def memories(input_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        return parser.parse(f)
+
+
+def test_commit_and_checkout(memories, tmp_path):
+    with SnapshotStore(tmp_path / "store.db") as store:
+        first = store.commit(memories, "first")
+        changed = copy.deepcopy(memories)
+        changed[1].frequency = Frequency(447_125_000)
+        del changed[5]
+        second = store.commit(changed, "second")
+        assert list(store.checkout(first)) == memories
+        assert list(store.checkout(second)) == changed
+        assert [(r.id, r.message, r.count) for r in store.revisions()] == [
+            (first, "first", len(memories)),
+            (second, "second", len(memories) - 1),
+        ]
+        assert store.latest() == second
+        with pytest.raises(KeyError):
+            store.checkout(second + 1)
+
+
+def test_deduplication(memories, tmp_path):
+    path = tmp_path / "store.db"
+    with SnapshotStore(path) as store:
+        for revision in range(50):
+            changed = copy.deepcopy(memories)
+            changed[0].name16 = f"APRS {revision}"
+            store.commit(changed)
+        (records,) = store._connection.execute("SELECT count(*) FROM records")
+        assert records[0] == len(memories) + 49
+    # much smaller than 50 full copies of the list
+    renderer = hrpt.renderers.JSONLinesRenderer()
+    full_size = 50 * sum(len(renderer.render_memory(m)) + 1 for m in memories)
+    size = sum(os.path.getsize(p) for p in tmp_path.iterdir())
+    assert size < full_size / 5
+
+
+def test_diff(memories, tmp_path):
+    with SnapshotStore(tmp_path / "store.db") as store:
+        first = store.commit(memories)
+        changed = copy.deepcopy(memories)
+        changed[1].frequency = Frequency(447_125_000)
+        removed = changed.pop(5)
+        changed[10].number = 998
+        second = store.commit(changed)
+        result = store.diff(first, second)
+        assert result.removed == [removed]
+        assert [c.new.number for c in result.modified] == [101]
+        assert [(c.old.number, c.new.number) for c in result.moved] == [
+            (memories[11].number, 998)
+        ]
+        assert not result.added
+        assert not store.diff(second, second)
+
+
+def test_snapshot_command(input_files_dir, output_files_dir, tmp_path, capsys):
+    store = str(tmp_path / "store.db")
+    input_file = str(input_files_dir / "mem1000-CHIRP.csv")
+    assert main(["snapshot", store, "commit", input_file, "-m", "master"]) == 0
+    assert main(["snapshot", store, "log"]) == 0
+    out, _ = capsys.readouterr()
+    assert "revision 1: 303 memories" in out
+    assert "303 memories master" in out
+
+    output_file = tmp_path / "out.csv"
+    assert main(["-o", str(output_file), "snapshot", store, "checkout"]) == 0
+    reference_file = output_files_dir / "mem1000-ADMS16.csv"
+    assert output_file.read_text() == reference_file.read_text()
+
+    assert main(["snapshot", store, "diff", "1", "1"]) == 0
+    assert main(["snapshot", store, "diff", "1", "2"]) == 1
+    assert main(["snapshot", store, "checkout", "7"]) == 1
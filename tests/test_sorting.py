@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2024 Jared Crapo, K0TFU
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import random
+
+import pytest
+
+import hrpt
+from hrpt.__main__ import main
+from hrpt.models import Memory
+from hrpt.sorting import SORT_KEYS, external_sort, renumber, spool
+
+
+@pytest.fixture
+def memories(input_files_dir):
+    parser = hrpt.parsers.CHIRPParser()
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8", newline="") as f:
+        memories = parser.parse(f)
+    random.Random(42).shuffle(memories)
+    return memories
+
+
+@pytest.mark.parametrize("key", sorted(SORT_KEYS))
+@pytest.mark.parametrize("buffer_size", [1, 7, 100, 1_000_000])
+def test_external_sort(memories, key, buffer_size):
+    expected = sorted(memories, key=SORT_KEYS[key])
+    result = list(external_sort(iter(memories), key, buffer_size=buffer_size))
+    assert result == expected
+
+
+def test_external_sort_many_runs(memories, monkeypatch):
+    # force several merge passes
+    monkeypatch.setattr(hrpt.sorting, "MAX_MERGE_RUNS", 3)
+    expected = sorted(memories, key=SORT_KEYS["frequency"])
+    assert list(external_sort(memories, "frequency", buffer_size=10)) == expected
+
+
+def test_external_sort_key_function(memories):
+    def key(memory):
+        return memory.name16
+
+    expected = sorted(memories, key=key)
+    assert list(external_sort(memories, key, buffer_size=50)) == expected
+
+
+def test_external_sort_empty():
+    assert list(external_sort([], buffer_size=1)) == []
+
+
+def test_convert_sort(input_files_dir, output_files_dir, tmp_path):
+    # shuffle the input file, sorting should put it back the way it was
+    shuffled_file = tmp_path / "shuffled.csv"
+    with open(input_files_dir / "mem1000-CHIRP.csv", encoding="utf8") as f:
+        header, *rows = f.readlines()
+    random.Random(42).shuffle(rows)
+    shuffled_file.write_text(header + "".join(rows), encoding="utf8")
+
+    output_file = tmp_path / "out.csv"
+    argv = ["-i", str(shuffled_file), "-o", str(output_file)]
+    assert main([*argv, "--sort", "number", "--sort-buffer", "25"]) == 0
+    reference_file = output_files_dir / "mem1000-ADMS16.csv"
+    assert output_file.read_text() == reference_file.read_text()
+
+
+@pytest.mark.parametrize("key", ["frequency", "band"])
+def test_convert_sort_renumbers(input_files_dir, tmp_path, key):
+    # adms16 puts memories in slots by number, so sorting by frequency must
+    # renumber them or most of them would be dropped
+    output_file = tmp_path / "out.csv"
+    input_file = input_files_dir / "mem1000-CHIRP.csv"
+    argv = ["-i", str(input_file), "-o", str(output_file), "--sort", key]
+    assert main([*argv, "--sort-buffer", "25"]) == 0
+    rows = [line.split(",") for line in output_file.read_text().splitlines()]
+    assert len(rows) == 999
+    used = [row for row in rows if row[1]]
+    # every one of the 303 memories in the input, with no gaps
+    assert [row[0] for row in used] == [str(n) for n in range(1, 304)]
+    if key == "frequency":
+        frequencies = [float(row[1]) for row in used]
+        assert frequencies == sorted(frequencies)
+
+
+def test_convert_sort_jsonl_keeps_numbers(input_files_dir, tmp_path):
+    output_file = tmp_path / "out.jsonl"
+    input_file = input_files_dir / "mem1000-CHIRP.csv"
+    argv = ["-i", str(input_file), "-o", str(output_file), "--to", "jsonl"]
+    assert main([*argv, "--sort", "frequency"]) == 0
+    with open(output_file, encoding="utf8") as f:
+        memories = hrpt.parsers.JSONLinesParser().parse(f)
+    with open(input_file, encoding="utf8", newline="") as f:
+        original = hrpt.parsers.CHIRPParser().parse(f)
+    assert memories == sorted(original, key=SORT_KEYS["frequency"])
+
+
+def test_renumber():
+    memories = [Memory(number) for number in (7, 3, 500)]
+    assert [m.number for m in renumber(memories, 10)] == [10, 11, 12]
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 1_000_000])
+def test_spool(memories, buffer_size, tmp_path):
+    result = list(spool(iter(memories), buffer_size=buffer_size, tmpdir=tmp_path))
+    assert result == memories
+    # the temporary file is gone when we're done
+    assert not list(tmp_path.iterdir())